@@ -0,0 +1,236 @@
+# ai/chart_summary.py
+"""
+Compact, size-bounded description of InsightRequest.chart_data for the insight prompt.
+
+The prompt used to carry json.dumps(chart_data, indent=2) cut at 4000 characters, which
+split large charts mid-record and spent tokens on indentation. summarize_chart_data()
+instead detects the time / label / numeric columns and sends, per numeric column,
+statistics over every row (min, max, mean, least-squares trend slope, top/bottom k and
+change points in the mean) plus the series downsampled with LTTB (Largest-Triangle-
+Three-Buckets, which keeps the visually significant peaks and dips). Small charts are
+sent as-is. The output never exceeds MAX_SUMMARY_CHARS: series points, then columns are
+reduced until it fits.
+"""
+import json
+import math
+import re
+from datetime import date, datetime
+
+import numpy as np
+
+MAX_SUMMARY_CHARS = 4000
+# Bump whenever the summary's output changes, so cached insights built from the old format are not reused
+SUMMARY_FORMAT_VERSION = 1
+# Charts up to this size are sent row by row instead of summarized
+RAW_DATA_CHARS = 1500
+SERIES_POINTS = 40
+MAX_NUMERIC_COLUMNS = 6
+TOP_K = 3
+MAX_CHANGE_POINTS = 3
+# A change point needs at least this many rows on each side and a shift of this many standard errors
+CHANGE_MIN_SEGMENT = 3
+CHANGE_MIN_SCORE = 3.0
+# Share of non-empty values that must parse for a column to count as numeric / time
+DETECT_RATIO = 0.8
+TIME_NAME_HINTS = ("date", "time", "day", "week", "month", "year", "period")
+
+
+def compact_json(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def to_number(value) -> float | None:
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if math.isfinite(value) else None
+    if isinstance(value, str):
+        try:
+            number = float(value.replace(",", ""))
+        except ValueError:
+            return None
+        return number if math.isfinite(number) else None
+    return None
+
+
+def to_timestamp(value) -> float | None:
+    """Epoch seconds for dates / ISO strings ("2024-03-01", "2024-03-01T10:00", "2024-03")."""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day).timestamp()
+    if not isinstance(value, str) or len(value) < 7:
+        return None
+    for candidate in (value, f"{value}-01"):
+        try:
+            return datetime.fromisoformat(candidate.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+def is_time_name(key: str) -> bool:
+    return bool(set(re.split(r"[\W_]+", key.lower())) & set(TIME_NAME_HINTS))
+
+
+def _parses(values: list, parse) -> list | None:
+    parsed = [parse(v) for v in values]
+    present = [v for v in values if v not in (None, "")]
+    ok = sum(p is not None for p in parsed)
+    return parsed if present and ok / len(present) >= DETECT_RATIO else None
+
+
+def detect_columns(rows: list) -> tuple[str | None, str | None, dict]:
+    """(time column, label column, {numeric column: parsed values}) for a list of row dicts."""
+    keys = list(dict.fromkeys(key for row in rows for key in row))
+    time_key, label_key, numeric = None, None, {}
+    for key in keys:
+        values = [row.get(key) for row in rows]
+        numbers = _parses(values, to_number)
+        if time_key is None:
+            # Dates, or integers under a time-ish name ("year", "week"), are the x axis, not a measure
+            if numbers is None and _parses(values, to_timestamp) is not None or numbers is not None and is_time_name(key):
+                time_key = key
+                continue
+        if numbers is not None:
+            numeric[key] = numbers
+        elif label_key is None:
+            label_key = key
+    return time_key, label_key, numeric
+
+
+def lttb(xs: np.ndarray, ys: np.ndarray, threshold: int) -> list:
+    """Indices of the points Largest-Triangle-Three-Buckets keeps (first and last always)."""
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    selected, a = [0], 0
+    for i in range(threshold - 2):
+        avg_start, avg_end = int((i + 1) * every) + 1, min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = xs[avg_start:avg_end].mean(), ys[avg_start:avg_end].mean()
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        areas = np.abs((xs[a] - avg_x) * (ys[start:end] - ys[a]) - (xs[a] - xs[start:end]) * (avg_y - ys[a]))
+        a = start + int(np.argmax(areas))
+        selected.append(a)
+    selected.append(n - 1)
+    return selected
+
+
+def change_points(ys: np.ndarray, max_points: int = MAX_CHANGE_POINTS) -> list:
+    """Indices where the mean shifts, by binary segmentation on a two-sample t-like score."""
+    sigma = ys.std()
+    if len(ys) < 2 * CHANGE_MIN_SEGMENT or sigma == 0:
+        return []
+    segments, found = [(0, len(ys))], []
+    for _ in range(max_points):
+        best = None  # (score, split, segment)
+        for s, e in segments:
+            if e - s < 2 * CHANGE_MIN_SEGMENT:
+                continue
+            segment = ys[s:e]
+            splits = np.arange(CHANGE_MIN_SEGMENT, len(segment) - CHANGE_MIN_SEGMENT + 1)
+            cumsum = np.cumsum(segment)
+            left_n, right_n = splits, len(segment) - splits
+            left_mean = cumsum[splits - 1] / left_n
+            right_mean = (cumsum[-1] - cumsum[splits - 1]) / right_n
+            scores = np.abs(left_mean - right_mean) * np.sqrt(left_n * right_n / len(segment)) / sigma
+            j = int(np.argmax(scores))
+            if scores[j] >= CHANGE_MIN_SCORE and (best is None or scores[j] > best[0]):
+                best = (scores[j], s + int(splits[j]), (s, e))
+        if best is None:
+            break
+        _, split, (s, e) = best
+        segments.remove((s, e))
+        segments += [(s, split), (split, e)]
+        found.append(split)
+    return sorted(found)
+
+
+def _round(value: float) -> float:
+    return float(f"{value:.6g}") if value else 0.0
+
+
+def column_stats(name: str, ys: np.ndarray, xs: np.ndarray, labels: list, slope_unit: str | None) -> dict:
+    """Statistics over every value; trend and change points only along an ordered (time) axis."""
+    order = np.argsort(ys, kind="stable")
+    stats = {
+        "column": name,
+        "count": int(len(ys)),
+        "min": [labels[order[0]], _round(ys[order[0]])],
+        "max": [labels[order[-1]], _round(ys[order[-1]])],
+        "mean": _round(ys.mean()),
+        "sum": _round(ys.sum()),
+        "top": [[labels[i], _round(ys[i])] for i in order[::-1][:TOP_K]],
+        "bottom": [[labels[i], _round(ys[i])] for i in order[:TOP_K]],
+    }
+    if slope_unit is None:
+        return stats
+    slope = np.polyfit(xs, ys, 1)[0] if len(ys) > 1 and np.ptp(xs) > 0 else 0.0
+    stats[f"slope_per_{slope_unit}"] = _round(slope)
+    stats["first_to_last"] = [_round(ys[0]), _round(ys[-1])]
+    cuts = change_points(ys)
+    if cuts:
+        bounds = [0] + cuts + [len(ys)]
+        stats["change_points"] = [
+            {"at": labels[cut], "mean_before": _round(ys[bounds[k]:cut].mean()), "mean_after": _round(ys[cut:bounds[k + 2]].mean())}
+            for k, cut in enumerate(cuts)
+        ]
+    return stats
+
+
+def summarize_chart_data(chart_data: list, max_chars: int = MAX_SUMMARY_CHARS) -> str:
+    """Prompt text for chart_data, at most max_chars long."""
+    rows = [row for row in chart_data if isinstance(row, dict)]
+    raw = compact_json(rows)
+    if len(raw) <= RAW_DATA_CHARS:
+        return raw
+
+    time_key, label_key, numeric = detect_columns(rows)
+    if time_key is not None:
+        timestamps = [to_timestamp(row.get(time_key)) or to_number(row.get(time_key)) for row in rows]
+        valid = [i for i, t in enumerate(timestamps) if t is not None]
+        # Series are read in time order whatever order the chart sent them in
+        valid.sort(key=lambda i: timestamps[i])
+    else:
+        valid = list(range(len(rows)))
+    labels_all = [str(rows[i].get(time_key or label_key, i)) for i in valid]
+
+    columns = []
+    for name, values in list(numeric.items())[:MAX_NUMERIC_COLUMNS]:
+        keep = [k for k, i in enumerate(valid) if values[i] is not None]
+        if not keep:
+            continue
+        ys = np.array([values[valid[k]] for k in keep], dtype=float)
+        if time_key is not None and to_timestamp(rows[valid[0]].get(time_key)) is not None:
+            xs, unit = np.array([timestamps[valid[k]] for k in keep], dtype=float) / 86400.0, "day"
+        elif time_key is not None:
+            xs, unit = np.array([timestamps[valid[k]] for k in keep], dtype=float), time_key
+        else:
+            # Categories (items, ...) have no order to fit a trend along; the series keeps the chart's order
+            xs, unit = np.arange(len(keep), dtype=float), None
+        labels = [labels_all[k] for k in keep]
+        columns.append((column_stats(name, ys, xs, labels, unit), ys, xs, labels))
+
+    def render(points: int, column_count: int) -> str:
+        rendered = []
+        for stats, ys, xs, labels in columns[:column_count]:
+            if points:
+                stats = {**stats, "series": [[labels[i], _round(ys[i])] for i in lttb(xs, ys, points)]}
+            rendered.append(stats)
+        return compact_json({"rows": len(rows), "x": time_key or label_key or "row", "columns": rendered})
+
+    points, column_count = SERIES_POINTS, len(columns)
+    text = render(points, column_count)
+    while len(text) > max_chars:
+        if points > 10:
+            points //= 2
+        elif points:
+            points = 0
+        elif column_count > 1:
+            column_count -= 1
+        else:
+            # Only reachable with extremely long labels
+            return text[:max_chars - 15] + "...(truncated)"
+        text = render(points, column_count)
+    return text
@@ -0,0 +1,93 @@
+# ai/gemini.py
+"""
+Gemini model objects and system prompts shared by every request.
+
+The chat, chat-helper and insight models are built once (at app startup) instead of
+per request; a model is only rebuilt when its prompt file changes on disk, so prompts
+can still be edited without restarting the server. The underlying gRPC client is
+shared by all models, and warm_up() opens its connection before the first request.
+"""
+import os
+import time
+
+import google.generativeai as genai
+
+from ai.tools import gemini_function_declarations
+
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-1.5-flash-latest")
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+CHAT_PROMPT = "prompt3.txt"
+HELPER_PROMPT = "chatbot_helper.txt"
+
+
+class PromptStore:
+    """System prompt files, re-read only when their mtime or size changes."""
+
+    def __init__(self, directory: str = PROMPTS_DIR):
+        self.directory = directory
+        self._prompts = {}  # name -> ((mtime_ns, size), text)
+        self.reloads = 0
+
+    def get(self, name: str) -> str:
+        path = os.path.join(self.directory, name)
+        st = os.stat(path)
+        version = (st.st_mtime_ns, st.st_size)
+        cached = self._prompts.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with open(path, "r") as f:
+            text = f.read()
+        self._prompts[name] = (version, text)
+        self.reloads += 1
+        if cached is not None:
+            print(f"Reloaded prompt {name}")
+        return text
+
+
+class GeminiModels:
+    def __init__(self, prompts: PromptStore, model_name: str = GEMINI_MODEL_NAME):
+        self.prompts = prompts
+        self.model_name = model_name
+        self._models = {}  # key -> (system prompt, GenerativeModel)
+        self.builds = 0
+
+    def _model(self, key: str, prompt_name: str | None = None, **kwargs) -> genai.GenerativeModel:
+        system_instruction = self.prompts.get(prompt_name) if prompt_name else None
+        cached = self._models.get(key)
+        if cached is not None and cached[0] == system_instruction:
+            return cached[1]
+        model = genai.GenerativeModel(model_name=self.model_name, system_instruction=system_instruction, **kwargs)
+        self._models[key] = (system_instruction, model)
+        self.builds += 1
+        return model
+
+    def chat_model(self) -> genai.GenerativeModel:
+        """Tool-calling model for /api/chat."""
+        return self._model("chat", CHAT_PROMPT, tools=gemini_function_declarations)
+
+    def helper_model(self) -> genai.GenerativeModel:
+        """Model phrasing the replies to function call results."""
+        return self._model("helper", HELPER_PROMPT)
+
+    def insight_model(self) -> genai.GenerativeModel:
+        """Plain text generation for chart insights (no tools, no system prompt)."""
+        return self._model("insight")
+
+    async def warm_up(self):
+        """Build every model and open the API connection (count_tokens does not generate anything)."""
+        self.chat_model()
+        self.helper_model()
+        started = time.perf_counter()
+        await self.insight_model().count_tokens_async("ping")
+        print(f"Gemini connection warmed up in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def stats(self) -> dict:
+        return {
+            "model_name": self.model_name,
+            "models": sorted(self._models),
+            "model_builds": self.builds,
+            "prompt_reloads": self.prompts.reloads,
+        }
+
+
+gemini_models = GeminiModels(PromptStore())
@@ -0,0 +1,202 @@
+# ai/history.py
+"""
+Token budget for the chat history sent to Gemini.
+
+The frontend sends the whole conversation on every turn, and the chat model and the
+helper model both receive it, so long dashboard sessions grew the prompt (and the
+latency) without bound. compact() keeps the last CHAT_HISTORY_KEEP_TURNS messages
+verbatim and collapses everything older into a short summary message. The summary is
+extractive (first sentence of each message, no model call) and rolling: it is cached
+under a hash of the history prefix it covers, so the next turn only summarizes the
+messages that dropped out of the window since. Older tool echoes (bullet lists of
+quantities we can fetch again) are reduced to their header line. If the result still
+exceeds CHAT_HISTORY_TOKEN_BUDGET, the oldest summary lines and then the oldest kept
+turns are dropped, down to the latest exchange. Roles keep alternating, and once
+messages are dropped the history still opens with a user turn.
+
+Tokens are estimated at CHARS_PER_TOKEN characters per token; counting them exactly
+would take an API round trip per message.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import deque
+
+from cachetools import LRUCache
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "2000"))
+HISTORY_KEEP_TURNS = int(os.getenv("CHAT_HISTORY_KEEP_TURNS", "6"))  # Messages kept verbatim
+HISTORY_SUMMARY_TOKENS = int(os.getenv("CHAT_HISTORY_SUMMARY_TOKENS", "400"))
+HISTORY_SUMMARY_CACHE_SIZE = int(os.getenv("CHAT_HISTORY_SUMMARY_CACHE_SIZE", "1024"))
+CHARS_PER_TOKEN = 4
+SUMMARY_LINE_CHARS = 160
+# Model messages with at least this many bullet lines are treated as tool output echoes
+ECHO_MIN_ITEMS = 3
+
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+SUMMARY_ACK = "Understood."
+BULLET_RE = re.compile(r"^\s*[*\-•]\s+")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def message_text(message: dict) -> str:
+    return "".join(part.get("text", "") for part in message.get("parts", []))
+
+
+def history_tokens(history: list) -> int:
+    return sum(estimate_tokens(message_text(m)) for m in history)
+
+
+def text_message(role: str, text: str) -> dict:
+    return {"role": role, "parts": [{"text": text}]}
+
+
+def drop_tool_echo(text: str) -> str | None:
+    """A model reply without its bullet list, or None if it is not a tool echo."""
+    lines = text.splitlines()
+    items = sum(1 for line in lines if BULLET_RE.match(line))
+    if items < ECHO_MIN_ITEMS:
+        return None
+    kept = [line for line in lines if line.strip() and not BULLET_RE.match(line)]
+    return "\n".join(kept + [f"[{items} listed items omitted]"])
+
+
+def summary_line(message: dict) -> str:
+    """First sentence or line of a message, shortened to SUMMARY_LINE_CHARS."""
+    text = message_text(message).strip()
+    first = SENTENCE_RE.split(text.splitlines()[0] if text else "", maxsplit=1)[0]
+    if len(first) > SUMMARY_LINE_CHARS:
+        first = first[:SUMMARY_LINE_CHARS - 3].rstrip() + "..."
+    speaker = "User" if message["role"] == "user" else "Assistant"
+    return f"- {speaker}: {first}"
+
+
+def prefix_hashes(history: list) -> list:
+    """hashes[i] identifies history[:i + 1]; each hash chains the previous one."""
+    hashes, digest = [], b""
+    for message in history:
+        digest = hashlib.sha256(digest + message["role"].encode() + b"\0" + message_text(message).encode("utf-8")).digest()
+        hashes.append(digest)
+    return hashes
+
+
+class HistoryManager:
+    def __init__(self, token_budget: int = HISTORY_TOKEN_BUDGET, keep_turns: int = HISTORY_KEEP_TURNS,
+                 summary_tokens: int = HISTORY_SUMMARY_TOKENS, cache_size: int = HISTORY_SUMMARY_CACHE_SIZE):
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.summary_tokens = summary_tokens
+        self._summaries = LRUCache(maxsize=cache_size)  # prefix hash -> summary lines
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.compacted = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.echoes_dropped = 0
+        self.summary_hits = 0
+        self.summary_misses = 0
+        self.last_requests = deque(maxlen=100)  # Per-request usage, newest last
+
+    def _summary_lines(self, older: list) -> tuple[list, int]:
+        """(rolling summary of `older`, messages whose summary came from the cache)."""
+        hashes = prefix_hashes(older)
+        lines, start = [], 0
+        with self._lock:
+            for index in range(len(hashes) - 1, -1, -1):
+                cached = self._summaries.get(hashes[index])
+                if cached is not None:
+                    lines, start = list(cached), index + 1
+                    break
+        lines.extend(summary_line(m) for m in older[start:])
+        # Oldest lines go first once the summary outgrows its own budget
+        while len(lines) > 1 and sum(estimate_tokens(line) for line in lines) > self.summary_tokens:
+            lines.pop(0)
+        with self._lock:
+            self._summaries[hashes[-1]] = list(lines)
+            if start:
+                self.summary_hits += 1
+            else:
+                self.summary_misses += 1
+        return lines, start
+
+    def compact(self, history: list) -> tuple[list, dict]:
+        """(history to send, usage) for Gemini-formatted history ({"role", "parts"} dicts)."""
+        tokens_before = history_tokens(history)
+        usage = {"messages": len(history), "tokens_before": tokens_before, "echoes_dropped": 0,
+                 "summarized_messages": 0, "summary_reused_messages": 0}
+
+        # Tool echoes are only trimmed outside the latest exchange, which the user may refer to
+        trimmed = []
+        for index, message in enumerate(history):
+            if message["role"] == "model" and index < len(history) - 2:
+                without_list = drop_tool_echo(message_text(message))
+                if without_list is not None:
+                    message = text_message("model", without_list)
+                    usage["echoes_dropped"] += 1
+            # Drop a message that repeats the previous one verbatim (double sends, retries)
+            if trimmed and trimmed[-1]["role"] == message["role"] and message_text(trimmed[-1]) == message_text(message):
+                continue
+            trimmed.append(message)
+
+        split = max(len(trimmed) - self.keep_turns, 0)
+        older, recent = trimmed[:split], trimmed[split:]
+        summary = []
+        if older:
+            summary, usage["summary_reused_messages"] = self._summary_lines(older)
+            usage["summarized_messages"] = len(older)
+
+        def assemble() -> list:
+            if not summary:
+                # Once earlier messages are gone, don't open on a reply to a question that was dropped
+                if len(recent) < len(trimmed) and recent and recent[0]["role"] == "model":
+                    return recent[1:]
+                return list(recent)
+            head = [text_message("user", "\n".join([SUMMARY_HEADER] + summary))]
+            # Keep the roles alternating after the summary turn
+            if not recent or recent[0]["role"] == "user":
+                head.append(text_message("model", SUMMARY_ACK))
+            return head + recent
+
+        # The latest exchange (from the last user message on) is kept even when it alone exceeds the budget
+        latest = next((len(trimmed) - i for i in range(len(trimmed) - 1, -1, -1) if trimmed[i]["role"] == "user"), 1)
+        compacted = assemble()
+        while history_tokens(compacted) > self.token_budget and (summary or len(recent) > latest):
+            if summary:
+                summary.pop(0)
+            else:
+                recent = recent[1:]
+            compacted = assemble()
+
+        usage["tokens_after"] = history_tokens(compacted)
+        usage["tokens_saved"] = tokens_before - usage["tokens_after"]
+        with self._lock:
+            self.requests += 1
+            self.compacted += compacted != history
+            self.tokens_before += tokens_before
+            self.tokens_after += usage["tokens_after"]
+            self.echoes_dropped += usage["echoes_dropped"]
+            self.last_requests.append(usage)
+        return compacted, usage
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "token_budget": self.token_budget,
+                "keep_turns": self.keep_turns,
+                "requests": self.requests,
+                "compacted": self.compacted,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "tokens_saved": self.tokens_before - self.tokens_after,
+                "echoes_dropped": self.echoes_dropped,
+                "summary_cache": {"entries": len(self._summaries), "hits": self.summary_hits, "misses": self.summary_misses},
+                "last_requests": list(self.last_requests)[-10:],
+            }
+
+
+history_manager = HistoryManager()
@@ -0,0 +1,147 @@
+# ai/insight_cache.py
+"""
+Content-addressed cache for /api/generate_insights.
+
+The dashboard asks for an insight on the same chart every time a page loads. Entries
+are keyed by merchant, chart title and a canonical hash of chart_data (key order and
+whitespace do not matter), so identical charts are answered from memory and only
+changed data reaches Gemini. Entries expire after INSIGHT_CACHE_TTL seconds; the
+in-memory tier keeps at most INSIGHT_CACHE_SIZE of them, and an optional on-disk tier
+(INSIGHT_CACHE_DIR) lets them survive restarts and be shared between workers.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from cachetools import TTLCache
+
+INSIGHT_CACHE_SIZE = int(os.getenv("INSIGHT_CACHE_SIZE", "512"))
+INSIGHT_CACHE_TTL = float(os.getenv("INSIGHT_CACHE_TTL", "3600"))
+INSIGHT_CACHE_DIR = os.getenv("INSIGHT_CACHE_DIR", "")  # Empty: memory only
+INSIGHT_CACHE_DISK_MAX_ENTRIES = int(os.getenv("INSIGHT_CACHE_DISK_MAX_ENTRIES", "10000"))
+# Enforce the disk bound after this many writes
+DISK_PRUNE_EVERY = 100
+
+
+def chart_data_hash(chart_data) -> str:
+    """sha256 of chart_data in canonical JSON form (sorted keys, no whitespace)."""
+    canonical = json.dumps(chart_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def insight_cache_key(merchant_id: str, chart_title: str, chart_data, variant: str = "") -> str:
+    """Cache key; `variant` separates insights produced by different models / prompt versions."""
+    raw = json.dumps([merchant_id, chart_title, chart_data_hash(chart_data), variant], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class InsightCache:
+    def __init__(self, max_entries: int = INSIGHT_CACHE_SIZE, ttl: float = INSIGHT_CACHE_TTL,
+                 cache_dir: str = INSIGHT_CACHE_DIR, disk_max_entries: int = INSIGHT_CACHE_DISK_MAX_ENTRIES):
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.disk_max_entries = disk_max_entries
+        self._entries = TTLCache(maxsize=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            insight = self._entries.get(key)
+            if insight is not None:
+                self.hits += 1
+                return insight
+
+        insight = self._read_disk(key) if self.cache_dir else None
+        with self._lock:
+            if insight is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._entries[key] = insight
+        return insight
+
+    def put(self, key: str, insight: str):
+        with self._lock:
+            self._entries[key] = insight
+        if self.cache_dir:
+            self._write_disk(key, insight)
+
+    def _read_disk(self, key: str) -> str | None:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: could not read cached insight {key}: {e}")
+            return None
+        if time.time() - entry["created_at"] > self.ttl:
+            return None
+        return entry["insight"]
+
+    def _write_disk(self, key: str, insight: str):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"insight": insight, "created_at": time.time()}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)  # Atomic, readers never see a half-written entry
+        except Exception as e:
+            # The in-memory entry is still valid, we just lose persistence for it
+            print(f"Warning: could not write cached insight {key}: {e}")
+            return
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % DISK_PRUNE_EVERY == 0
+        if prune:
+            self.prune_disk()
+
+    def prune_disk(self) -> int:
+        """Delete expired entries, then the oldest ones beyond disk_max_entries. Returns files removed."""
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        files.append((os.path.getmtime(path), path))
+                    except FileNotFoundError:
+                        pass
+        files.sort()
+        expired_before = time.time() - self.ttl
+        excess = len(files) - self.disk_max_entries
+        removed = 0
+        for index, (mtime, path) in enumerate(files):
+            if mtime >= expired_before and index >= excess:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self._entries.maxsize,
+                "ttl_seconds": self.ttl,
+                "disk": bool(self.cache_dir),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+
+insight_cache = InsightCache()
@@ -0,0 +1,139 @@
+# ai/intents.py
+"""
+Local fast path for /api/chat: maps unambiguous messages straight to a tool call.
+
+Requests such as "what are my sales for the next two weeks" or "show customers who
+ordered in the last 30 days" always end in the same function call, yet went through a
+full Gemini function-calling round trip first. match_intent() recognises these with a
+few keyword rules and resolves the period itself (days, weeks, fortnights, months,
+spelled-out numbers). It only answers when exactly one tool fits and the period is
+unambiguous and within the tool's limits; everything else returns None and goes to
+Gemini as before.
+"""
+import os
+import re
+
+LOCAL_INTENTS_ENABLED = os.getenv("CHAT_LOCAL_INTENTS", "1") != "0"
+# Longer messages usually carry more than one request or extra conditions
+MAX_INTENT_WORDS = 25
+
+ONES = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9}
+TENS = {"twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90}
+NUMBER_WORDS = {
+    "a": 1, "an": 1, **ONES, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19, **TENS,
+}
+UNIT_DAYS = {"day": 1, "week": 7, "fortnight": 14, "month": 30}
+
+# "twenty-one" is tried before "twenty"; a count right after a digit, point or comma ("1.5 weeks") is not one
+COUNT_PATTERN = (r"\d{1,3}|(?:" + "|".join(TENS) + r")[\s-](?:" + "|".join(ONES) + r")|" + "|".join(NUMBER_WORDS))
+PERIOD_RE = re.compile(
+    r"(?<![\d.,])\b(?:(?P<count>" + COUNT_PATTERN + r")[\s-]+)?(?P<unit>day|week|fortnight|month)(?P<plural>s)?\b"
+)
+TOMORROW_RE = re.compile(r"\btomorrow\b")
+FUTURE_RE = re.compile(r"\b(next|coming|upcoming|forecast\w*|predict\w*|expect\w*|projected|will|tomorrow)\b")
+PAST_RE = re.compile(r"\b(past|last|previous|sold|did|was|were|ago|yesterday)\b")
+# Negations, conditions, comparisons and explanations need the model
+COMPLEX_RE = re.compile(r"\b(not|no|don'?t|didn'?t|without|except|but|if|unless|when|compare\w*|versus|vs|why|explain|instead)\b|n't\b")
+# "customers who haven't ordered in 30 days": daysAgo keeps customers who *did* order in the
+# last N days, so an inactivity request must never be mapped onto it locally
+INACTIVE_RE = re.compile(r"\b(?:have|has|did)(?:n'?t| not) (?:ordered|bought|visited|been back|come back)\b")
+EMAIL_RE = re.compile(r"\b(e-?mails?|send|message|contact)\b")
+
+CUSTOMERS_RE = re.compile(r"\bcustomers?\b")
+SHOW_RE = re.compile(r"\b(show|list|display|see|view|who|which|find|get)\b")
+SALES_RE = re.compile(r"\b(sales|revenue|earnings|income|turnover)\b")
+QUANTITIES_RE = re.compile(r"\b(quantit(?:y|ies)|units|how many|items|dishes|stock|inventory)\b")
+
+FORECAST_MAX_DAYS = 30  # calculate_total_sales / get_forecasted_quantities
+ACTUALS_MAX_DAYS = 365  # get_actual_quantities
+
+
+def parse_count(count: str) -> int:
+    if count.isdigit():
+        return int(count)
+    return sum(NUMBER_WORDS[word] for word in re.split(r"[\s-]", count))  # "twenty-one" -> 20 + 1
+
+
+def parse_periods(text: str) -> list:
+    """
+    Length in days of every period mentioned ("next 2 weeks" -> [14], "a fortnight" -> [14],
+    "tomorrow" -> [1]); empty if there is none. A period whose length can't be read
+    ("a few days", "1.5 weeks", "two hundred days") is None.
+    """
+    periods = []
+    for m in PERIOD_RE.finditer(text):
+        if m["count"]:
+            periods.append(parse_count(m["count"]) * UNIT_DAYS[m["unit"]])
+        else:
+            # "next week" is one week; a plural without a count we understand is not
+            periods.append(None if m["plural"] else UNIT_DAYS[m["unit"]])
+    if TOMORROW_RE.search(text):
+        periods.append(1)
+    return periods
+
+
+def match_intent(message: str) -> dict | None:
+    """{"name": tool, "args": {...}} for a high-confidence message, None to ask Gemini."""
+    text = message.lower().replace("’", "'").strip()
+    if not text or len(text.split()) > MAX_INTENT_WORDS or EMAIL_RE.search(text):
+        return None
+
+    topics = [name for name, pattern in (("customers", CUSTOMERS_RE), ("sales", SALES_RE), ("quantities", QUANTITIES_RE))
+              if pattern.search(text)]
+    if len(topics) != 1:
+        return None
+    periods = parse_periods(text)
+    if len(periods) > 1 or None in periods:
+        return None  # "between 2 weeks and 3 months": a range, not a single period
+    days = periods[0] if periods else None
+
+    if topics[0] == "customers":
+        # daysAgo means "ordered within the last N days"; inactivity, negations and conditions go to Gemini
+        if not SHOW_RE.search(text) or INACTIVE_RE.search(text) or COMPLEX_RE.search(text):
+            return None
+        return {"name": "show_customers", "args": {"daysAgo": days} if days else {}}
+
+    if COMPLEX_RE.search(text) or days is None:
+        return None
+    future, past = bool(FUTURE_RE.search(text)), bool(PAST_RE.search(text))
+    if future == past:
+        return None
+
+    if topics[0] == "sales":
+        # Only forecasted sales have a tool; past sales questions go to the model
+        if future and 1 <= days <= FORECAST_MAX_DAYS:
+            return {"name": "calculate_total_sales", "args": {"days": days}}
+        return None
+    if future and 1 <= days <= FORECAST_MAX_DAYS:
+        return {"name": "get_forecasted_quantities", "args": {"days": days}}
+    if past and 1 <= days <= ACTUALS_MAX_DAYS:
+        return {"name": "get_actual_quantities", "args": {"days": days}}
+    return None
+
+
+class IntentStats:
+    """Fast-path hits per tool and fallbacks to Gemini."""
+
+    def __init__(self):
+        self.matched = {}
+        self.fallbacks = 0
+
+    def record(self, intent: dict | None):
+        if intent is None:
+            self.fallbacks += 1
+        else:
+            self.matched[intent["name"]] = self.matched.get(intent["name"], 0) + 1
+
+    def stats(self) -> dict:
+        hits = sum(self.matched.values())
+        total = hits + self.fallbacks
+        return {
+            "enabled": LOCAL_INTENTS_ENABLED,
+            "matched": dict(self.matched),
+            "fallbacks": self.fallbacks,
+            "hit_rate": round(hits / total, 4) if total else None,
+        }
+
+
+intent_stats = IntentStats()
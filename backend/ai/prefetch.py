@@ -0,0 +1,181 @@
+# ai/prefetch.py
+"""
+Speculative forecast prefetch for /api/chat (opt-in: CHAT_SPECULATIVE_PREFETCH=1).
+
+Most chats on the forecasting page end in calculate_total_sales or
+get_forecasted_quantities, which need a full forecast run (load + fit) that only
+starts after Gemini has picked the tool. With prefetching, the likely forecast is
+started on the forecast pool as soon as the message arrives, concurrently with the
+Gemini request. If Gemini picks that tool the result is claimed (a hit). Otherwise
+the work is cancelled if it is still waiting for a pool slot; a fit that already
+runs cannot be interrupted, so it finishes in the background (its model still lands
+in the model cache) and its CPU time is counted as wasted.
+
+Speculation never queues behind real work: it is skipped when the pool is busy.
+The run goes through forecast_flight under the same key as the real request, so a
+chat that needs the forecast joins the speculative run instead of fitting it twice,
+and a prefetch for a forecast that is already being computed just waits for it.
+CPU time is measured with time.thread_time() on the pool thread, so native threads
+spawned by XGBoost are not included and the wasted figure is a lower bound.
+"""
+import asyncio
+import os
+import re
+import threading
+import time
+
+from ai.intents import FUTURE_RE, PAST_RE, QUANTITIES_RE, SALES_RE
+from forecasts.executor import FORECAST_MAX_WORKERS, executor_stats, run_forecast
+from forecasts.forecast_qty import get_quantity_forecast, quantity_forecast_key
+from forecasts.forecast_sales import get_sales_forecast, sales_forecast_key
+from forecasts.singleflight import forecast_flight
+
+SPECULATIVE_PREFETCH = os.getenv("CHAT_SPECULATIVE_PREFETCH", "0") == "1"
+
+# Tool -> (blocking forecast it needs, its forecast_flight key)
+PREFETCH_TOOLS = {
+    "calculate_total_sales": (get_sales_forecast, sales_forecast_key),
+    "get_forecasted_quantities": (get_quantity_forecast, quantity_forecast_key),
+}
+CUSTOMERS_RE = re.compile(r"\b(customers?|e-?mails?)\b")
+
+
+def predict_tool(message: str) -> str | None:
+    """The forecasting tool Gemini is likely to pick for this message, if any."""
+    text = message.lower()
+    if CUSTOMERS_RE.search(text) or PAST_RE.search(text):
+        return None
+    sales, quantities = bool(SALES_RE.search(text)), bool(QUANTITIES_RE.search(text))
+    if quantities and not sales:
+        return "get_forecasted_quantities"
+    if sales or FUTURE_RE.search(text):
+        return "calculate_total_sales"  # The most common tool on the forecasting page
+    return None
+
+
+class Prefetch:
+    """One speculative forecast run for one chat request."""
+
+    def __init__(self, owner: "SpeculativePrefetcher", tool: str, merchant_id: str):
+        self.owner = owner
+        self.tool = tool
+        self.claimed = False
+        self.released = False
+        self.running = False
+        self.finished = False
+        self.cpu_seconds = 0.0
+        fn, flight_key = PREFETCH_TOOLS[tool]
+        # Cancelling a not yet started leader is safe: coalesced requests run the flight again
+        self.task = asyncio.create_task(
+            forecast_flight.do_async(flight_key(merchant_id), run_forecast, self._run, fn, merchant_id)
+        )
+        self.task.add_done_callback(_consume_result)
+
+    def _run(self, fn, merchant_id: str):
+        """Runs on the forecast pool thread."""
+        self.running = True
+        started = time.thread_time()
+        try:
+            return fn(merchant_id)
+        finally:
+            self.cpu_seconds = time.thread_time() - started
+            with self.owner._lock:
+                self.finished = True
+                wasted = self.released and not self.claimed
+            if wasted:
+                self.owner._add_cpu(self.cpu_seconds, wasted=True)
+
+    def claim(self, tool: str) -> asyncio.Task | None:
+        """The running forecast if `tool` is the one that was prefetched."""
+        if tool != self.tool or self.claimed:
+            return None
+        with self.owner._lock:
+            self.claimed = True
+            self.owner.hits += 1
+        self.task.add_done_callback(lambda _: self.owner._add_cpu(self.cpu_seconds, wasted=False))
+        return self.task
+
+    def release(self):
+        """End of the request: an unclaimed prefetch is a miss and is cancelled if it has not started."""
+        with self.owner._lock:
+            if self.claimed or self.released:
+                return
+            self.released = True
+            self.owner.misses += 1
+            finished = self.finished
+        if finished:
+            self.owner._add_cpu(self.cpu_seconds, wasted=True)
+        elif not self.running and self.task.cancel():
+            with self.owner._lock:
+                self.owner.cancelled += 1
+
+
+def _consume_result(task: asyncio.Task):
+    # Unclaimed speculative results and errors are dropped, not logged as "never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+class SpeculativePrefetcher:
+    def __init__(self, enabled: bool = SPECULATIVE_PREFETCH):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.started = 0
+        self.skipped_busy = 0
+        self.hits = 0
+        self.misses = 0
+        self.cancelled = 0
+        self.used_cpu_seconds = 0.0
+        self.wasted_cpu_seconds = 0.0
+
+    def start(self, message: str, merchant_id: str) -> Prefetch | None:
+        """Start the likely tool's forecast for this message; None when disabled, unsure or busy."""
+        if not self.enabled:
+            return None
+        tool = predict_tool(message)
+        if tool is None:
+            return None
+        pool = executor_stats()
+        if pool["running"] + pool["waiting"] >= FORECAST_MAX_WORKERS:
+            with self._lock:
+                self.skipped_busy += 1
+            return None
+        with self._lock:
+            self.started += 1
+        return Prefetch(self, tool, merchant_id)
+
+    def _add_cpu(self, seconds: float, wasted: bool):
+        with self._lock:
+            if wasted:
+                self.wasted_cpu_seconds += seconds
+            else:
+                self.used_cpu_seconds += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            decided = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "started": self.started,
+                "skipped_busy": self.skipped_busy,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / decided, 4) if decided else None,
+                "cancelled_before_start": self.cancelled,
+                "used_cpu_seconds": round(self.used_cpu_seconds, 3),
+                "wasted_cpu_seconds": round(self.wasted_cpu_seconds, 3),
+            }
+
+
+async def prefetched_or(prefetch: Prefetch | None, tool: str, compute, *args):
+    """Result of the speculative run for `tool` if one was started, else await compute(*args)."""
+    task = prefetch.claim(tool) if prefetch is not None else None
+    if task is not None:
+        try:
+            return await task
+        except Exception as e:
+            print(f"Warning: speculative {tool} forecast failed, recomputing: {type(e).__name__} - {e}")
+    return await compute(*args)
+
+
+speculative_prefetcher = SpeculativePrefetcher()
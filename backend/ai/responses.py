@@ -0,0 +1,68 @@
+# ai/responses.py
+"""
+Chat replies for tool results that only wrap a value we already have.
+
+calculate_total_sales, send_emails, show_customers and unhandled tools used to make a
+second, sequential Gemini call (chatFunctionHelper) just to phrase one sentence. In the
+default "template" mode the reply is filled from the localized templates below instead;
+"rich" keeps the helper model call for free-form phrasing. The mode comes from the
+request or CHAT_RESPONSE_MODE, the language from the request locale or CHAT_DEFAULT_LOCALE.
+"""
+import os
+
+RESPONSE_MODES = ("template", "rich")
+CHAT_RESPONSE_MODE = os.getenv("CHAT_RESPONSE_MODE", "template")
+if CHAT_RESPONSE_MODE not in RESPONSE_MODES:
+    print(f"Warning: unknown CHAT_RESPONSE_MODE '{CHAT_RESPONSE_MODE}', using 'template'.")
+    CHAT_RESPONSE_MODE = "template"
+DEFAULT_LOCALE = os.getenv("CHAT_DEFAULT_LOCALE", "en")
+
+TEMPLATES = {
+    "en": {
+        "total_sales": "Your total forecasted sales for the next {days} days are approximately ${total:,.2f}.",
+        "send_emails_confirmed": "Great, I'll prepare the emails for these customers.",
+        "send_emails_declined": "No problem, I won't send any emails.",
+        "show_customers_filtered": "Here are the customers who ordered in the last {days_ago} days. "
+                                   "Would you like me to prepare emails for them?",
+        "show_customers_all": "Here is your customer list. Would you like me to prepare emails for these customers?",
+        "unhandled": "Done, I've handled your request.",
+    },
+    "ms": {
+        "total_sales": "Jumlah jualan ramalan anda untuk {days} hari akan datang adalah kira-kira ${total:,.2f}.",
+        "send_emails_confirmed": "Baik, saya akan sediakan e-mel untuk pelanggan ini.",
+        "send_emails_declined": "Tiada masalah, saya tidak akan menghantar sebarang e-mel.",
+        "show_customers_filtered": "Berikut ialah pelanggan yang membuat pesanan dalam {days_ago} hari yang lalu. "
+                                   "Adakah anda mahu saya sediakan e-mel untuk mereka?",
+        "show_customers_all": "Berikut ialah senarai pelanggan anda. Adakah anda mahu saya sediakan e-mel untuk pelanggan ini?",
+        "unhandled": "Selesai, permintaan anda telah diproses.",
+    },
+    "id": {
+        "total_sales": "Total perkiraan penjualan Anda untuk {days} hari ke depan sekitar ${total:,.2f}.",
+        "send_emails_confirmed": "Baik, saya akan menyiapkan email untuk pelanggan-pelanggan ini.",
+        "send_emails_declined": "Tidak masalah, saya tidak akan mengirim email apa pun.",
+        "show_customers_filtered": "Berikut pelanggan yang memesan dalam {days_ago} hari terakhir. "
+                                   "Apakah Anda ingin saya menyiapkan email untuk mereka?",
+        "show_customers_all": "Berikut daftar pelanggan Anda. Apakah Anda ingin saya menyiapkan email untuk pelanggan-pelanggan ini?",
+        "unhandled": "Selesai, permintaan Anda sudah diproses.",
+    },
+    "zh": {
+        "total_sales": "未来 {days} 天的预计总销售额约为 ${total:,.2f}。",
+        "send_emails_confirmed": "好的，我会为这些顾客准备邮件。",
+        "send_emails_declined": "没问题，我不会发送任何邮件。",
+        "show_customers_filtered": "以下是过去 {days_ago} 天内下过单的顾客。需要我为他们准备邮件吗？",
+        "show_customers_all": "这是您的顾客列表。需要我为这些顾客准备邮件吗？",
+        "unhandled": "已完成，您的请求已处理。",
+    },
+}
+
+
+def resolve_locale(locale: str | None) -> str:
+    """'en-US' / 'zh_CN' -> 'en' / 'zh'; unsupported or missing locales use DEFAULT_LOCALE."""
+    language = (locale or "").replace("_", "-").split("-")[0].lower()
+    if language in TEMPLATES:
+        return language
+    return DEFAULT_LOCALE if DEFAULT_LOCALE in TEMPLATES else "en"
+
+
+def render_response(template: str, locale: str | None = None, **values) -> str:
+    return TEMPLATES[resolve_locale(locale)][template].format(**values)
@@ -1,20 +1,70 @@
+import os
+import threading
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
-from db.dependencies import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.dependencies import get_async_db
 from models.merchant import Merchant
 from schemas.merchant import TokenData
 from auth.auth import SECRET_KEY, ALGORITHM
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_merchant_by_merchant_id(db: Session, merchant_id: str):
-    return db.query(Merchant).filter(Merchant.merchant_id == merchant_id).first()
+# Merchant rows almost never change, so token -> merchant resolution is cached in-process.
+# Set MERCHANT_NEGATIVE_CACHE_TTL=0 to always re-check unknown merchant ids.
+MERCHANT_CACHE_SIZE = int(os.getenv("MERCHANT_CACHE_SIZE", "1024"))
+MERCHANT_CACHE_TTL = float(os.getenv("MERCHANT_CACHE_TTL", "300"))
+MERCHANT_NEGATIVE_CACHE_TTL = float(os.getenv("MERCHANT_NEGATIVE_CACHE_TTL", "30"))
+# Merchant accounts allowed to read other merchants' data and service metrics (comma-separated ids)
+ADMIN_MERCHANT_IDS = frozenset(m.strip() for m in os.getenv("ADMIN_MERCHANT_IDS", "").split(",") if m.strip())
+
+_merchant_cache = TTLCache(maxsize=MERCHANT_CACHE_SIZE, ttl=MERCHANT_CACHE_TTL)
+_unknown_merchants = TTLCache(maxsize=MERCHANT_CACHE_SIZE, ttl=MERCHANT_NEGATIVE_CACHE_TTL) if MERCHANT_NEGATIVE_CACHE_TTL > 0 else None
+_merchant_cache_lock = threading.Lock()
+
+async def get_merchant_by_merchant_id(db: AsyncSession, merchant_id: str):
+    result = await db.execute(select(Merchant).where(Merchant.merchant_id == merchant_id))
+    return result.scalars().first()
+
+async def get_cached_merchant(db: AsyncSession, merchant_id: str):
+    """get_merchant_by_merchant_id behind a bounded TTL cache (with optional negative caching)."""
+    with _merchant_cache_lock:
+        merchant = _merchant_cache.get(merchant_id)
+        if merchant is not None:
+            return merchant
+        if _unknown_merchants is not None and merchant_id in _unknown_merchants:
+            return None
+
+    merchant = await get_merchant_by_merchant_id(db, merchant_id)
+
+    with _merchant_cache_lock:
+        if merchant is None:
+            if _unknown_merchants is not None:
+                _unknown_merchants[merchant_id] = True
+            return None
+        # Detach it: the cached instance outlives this request's session
+        db.expunge(merchant)
+        _merchant_cache[merchant_id] = merchant
+    return merchant
+
+def invalidate_merchant(merchant_id: str | None = None):
+    """Drop one merchant (or everything) from the cache, e.g. after the merchants row changes."""
+    with _merchant_cache_lock:
+        if merchant_id is None:
+            _merchant_cache.clear()
+            if _unknown_merchants is not None:
+                _unknown_merchants.clear()
+        else:
+            _merchant_cache.pop(merchant_id, None)
+            if _unknown_merchants is not None:
+                _unknown_merchants.pop(merchant_id, None)
 
 async def get_current_merchant(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -29,7 +79,17 @@ async def get_current_merchant(
     except JWTError:
         raise credentials_exception
 
-    merchant = get_merchant_by_merchant_id(db, merchant_id)
+    # The database is only queried on a cache miss
+    merchant = await get_cached_merchant(db, merchant_id)
     if merchant is None:
         raise credentials_exception
     return merchant
+
+def is_admin(merchant: Merchant) -> bool:
+    return merchant.merchant_id.strip() in ADMIN_MERCHANT_IDS
+
+async def get_admin_merchant(merchant: Merchant = Depends(get_current_merchant)):
+    """get_current_merchant, restricted to the ADMIN_MERCHANT_IDS accounts."""
+    if not is_admin(merchant):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return merchant
@@ -0,0 +1,61 @@
+# benchmarks/bench_auth_cache.py
+"""
+Microbenchmark: per-request cost of get_current_merchant with and without the
+merchant cache.
+
+"uncached" clears the cache before every call, so each call decodes the JWT and
+runs the merchants lookup; "cached" only decodes the JWT. Needs the database
+from db/docker-compose.yaml and JWT_SECRET_KEY in the environment.
+
+    python -m benchmarks.bench_auth_cache --merchant 1d4f3 -n 2000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from auth.auth import create_access_token
+from auth.dependencies import get_current_merchant, invalidate_merchant
+from db.database import AsyncSessionLocal, async_engine
+
+
+async def time_calls(token: str, n: int, clear_cache: bool) -> list:
+    timings = []
+    for _ in range(n):
+        if clear_cache:
+            invalidate_merchant()
+        # One session per call, like the get_async_db dependency
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            await get_current_merchant(token=token, db=db)
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def summarize(label: str, timings: list) -> float:
+    us = sorted(x * 1e6 for x in timings)
+    mean = statistics.mean(us)
+    print(f"{label:<10} mean={mean:9.1f}us p50={us[len(us) // 2]:9.1f}us p99={us[int(len(us) * 0.99) - 1]:9.1f}us")
+    return mean
+
+
+async def run(args):
+    token = create_access_token(data={"sub": args.merchant})
+    await time_calls(token, 20, clear_cache=True)  # Warm up the connection pool
+
+    uncached = summarize("uncached", await time_calls(token, args.n, clear_cache=True))
+    invalidate_merchant()
+    cached = summarize("cached", await time_calls(token, args.n, clear_cache=False))
+    print(f"saving    {uncached - cached:9.1f}us per request ({uncached / cached:.1f}x faster)")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--merchant", required=True, help="An existing merchant_id")
+    parser.add_argument("-n", type=int, default=1000, help="Calls per scenario")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
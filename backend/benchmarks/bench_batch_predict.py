@@ -0,0 +1,50 @@
+# benchmarks/bench_batch_predict.py
+"""
+Microbenchmark: quantity forecasts for many merchants with the global model,
+one predict per merchant (what N /api/forecast_quantity calls do) against one
+batched predict (/api/forecast_quantity/batch).
+
+Needs a trained global model (python -m forecasts.global_qty); no database.
+
+    python -m benchmarks.bench_batch_predict --merchants 200
+"""
+import argparse
+import time
+
+from forecasts.global_qty import GlobalQuantityModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--merchants", type=int, default=200, help="Number of merchants to forecast")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode (best is reported)")
+    args = parser.parse_args()
+
+    model = GlobalQuantityModel.load()
+    if model is None:
+        raise SystemExit("No global quantity model registered; run `python -m forecasts.global_qty` first.")
+    merchant_ids = sorted(model.items_by_merchant)[:args.merchants]
+    rows = sum(len(model.items_by_merchant[m]) for m in merchant_ids) * args.days
+    print(f"{len(merchant_ids)} merchants, {rows:,} rows, {model.model.get_params().get('n_jobs')} predict threads")
+
+    def per_merchant():
+        return {m: model.predict_merchant(m, args.days) for m in merchant_ids}
+
+    def batched():
+        return model.predict_merchants(merchant_ids, args.days)
+
+    results = {}
+    for label, fn in [("per merchant", per_merchant), ("batched", batched)]:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        results[label] = min(timings)
+        print(f"  {label:<13} {results[label] * 1000:9.1f}ms  {rows / results[label]:12,.0f} rows/s")
+    print(f"  speedup       {results['per merchant'] / results['batched']:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
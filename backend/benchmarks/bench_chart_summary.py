@@ -0,0 +1,48 @@
+# benchmarks/bench_chart_summary.py
+"""
+Microbenchmark: insight prompt data for growing charts, the old pretty-printed
+JSON cut at 4000 characters against summarize_chart_data (ai/chart_summary.py).
+
+For each size a synthetic daily sales chart (date, total_sales, orders) is built.
+"rows seen" is how many rows actually reach the prompt: the truncated JSON stops
+mid-chart, while the summary's statistics always cover every row.
+
+    python -m benchmarks.bench_chart_summary --sizes 30 365 5000 50000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from ai.chart_summary import MAX_SUMMARY_CHARS, summarize_chart_data
+
+
+def make_chart(rows: int) -> list:
+    start = date(2020, 1, 1)
+    return [
+        {"date": str(start + timedelta(days=i)), "total_sales": round(100 + i * 0.05 + random.gauss(0, 8), 2), "orders": random.randint(5, 40)}
+        for i in range(rows)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[30, 365, 5000, 50000], help="Chart rows")
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f"{'rows':>7} {'pretty json':>12} {'truncated':>10} {'rows seen':>10} {'summary':>8} {'time':>9}")
+    for rows in args.sizes:
+        chart = make_chart(rows)
+        pretty = json.dumps(chart, indent=2)
+        truncated = pretty[:MAX_SUMMARY_CHARS]
+        rows_seen = min(rows, truncated.count('"orders"'))
+        started = time.perf_counter()
+        summary = summarize_chart_data(chart)
+        elapsed = time.perf_counter() - started
+        print(f"{rows:>7} {len(pretty):>12,} {len(truncated):>10,} {rows_seen:>10,} {len(summary):>8,} {elapsed * 1000:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_chat_concurrency.py
+"""
+Concurrency benchmark: /api/login latency while chat forecasts are in flight.
+
+Measures login latency first on an idle server, then again while several
+/api/chat requests that trigger forecasting tools (calculate_total_sales /
+get_forecasted_quantities) are running. With forecasting on the event loop the
+loaded p99 is roughly the length of a model fit; with the forecast pool it
+stays close to the idle numbers.
+
+Run against a live backend (clear FORECAST_CACHE_DIR and the precomputed
+forecast tables first so the chat calls really fit models):
+    python -m benchmarks.bench_chat_concurrency --merchant 1d4f3 --chats 4
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+CHAT_PROMPTS = [
+    "What are my total forecasted sales for the next 7 days?",
+    "How many of each item will I sell in the next two weeks?",
+]
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(label: str, latencies: list):
+    ms = [x * 1000 for x in latencies]
+    print(f"{label:<22} n={len(ms):<4} p50={percentile(ms, 50):8.1f}ms "
+          f"p95={percentile(ms, 95):8.1f}ms p99={percentile(ms, 99):8.1f}ms "
+          f"max={max(ms):8.1f}ms mean={statistics.mean(ms):8.1f}ms")
+
+
+async def login_loop(client: httpx.AsyncClient, merchant_id: str, stop: asyncio.Event, interval: float) -> list:
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.post("/api/login", json={"merchant_id": merchant_id, "password": "x"})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def chat_once(client: httpx.AsyncClient, token: str, prompt: str) -> float:
+    started = time.perf_counter()
+    response = await client.post(
+        "/api/chat",
+        json={"message": prompt, "history": []},
+        headers={"Authorization": f"bearer {token}"},
+    )
+    print(f"  chat ({response.status_code}) in {time.perf_counter() - started:.2f}s: {prompt}")
+    return time.perf_counter() - started
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=300) as client:
+        response = await client.post("/api/login", json={"merchant_id": args.merchant, "password": "x"})
+        response.raise_for_status()
+        token = response.json()["access_token"]
+
+        # Phase 1: idle baseline
+        stop = asyncio.Event()
+        idle_task = asyncio.create_task(login_loop(client, args.merchant, stop, args.interval))
+        await asyncio.sleep(args.idle_seconds)
+        stop.set()
+        idle = await idle_task
+
+        # Phase 2: logins while chat forecasts are in flight
+        stop = asyncio.Event()
+        loaded_task = asyncio.create_task(login_loop(client, args.merchant, stop, args.interval))
+        await asyncio.gather(*[
+            chat_once(client, token, CHAT_PROMPTS[i % len(CHAT_PROMPTS)]) for i in range(args.chats)
+        ])
+        stop.set()
+        loaded = await loaded_task
+
+    print()
+    summarize("login (idle)", idle)
+    summarize(f"login ({args.chats} chats)", loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:9000")
+    parser.add_argument("--merchant", required=True, help="merchant_id to log in as")
+    parser.add_argument("--chats", type=int, default=4, help="Concurrent forecasting chat requests")
+    parser.add_argument("--interval", type=float, default=0.05, help="Seconds between login probes")
+    parser.add_argument("--idle-seconds", type=float, default=5.0, help="Length of the idle baseline")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_chat_response_modes.py
+"""
+Microbenchmark: end-to-end /api/chat latency for tools whose reply only wraps a
+value we already have (calculate_total_sales, send_emails, show_customers), in
+"template" mode (ai/responses.py) and "rich" mode (second helper model call).
+
+Both Gemini calls are stubbed with a sleep of --llm-ms (jittered by +/-25%): the
+function-calling call happens in both modes, the helper call only in "rich".
+Tool results are precomputed, so the difference is the reply step alone.
+
+    python -m benchmarks.bench_chat_response_modes --llm-ms 800 -n 30
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from ai.responses import TEMPLATES, render_response
+
+TOOL_REPLIES = [
+    ("total_sales", {"days": 14, "total": 18342.5}),
+    ("send_emails_confirmed", {}),
+    ("show_customers_filtered", {"days_ago": 30}),
+    ("show_customers_all", {}),
+]
+
+
+async def stub_llm(llm_ms: float, text: str = "") -> str:
+    await asyncio.sleep(llm_ms * random.uniform(0.75, 1.25) / 1000)
+    return text
+
+
+async def chat_request(mode: str, template: str, values: dict, locale: str, llm_ms: float) -> str:
+    await stub_llm(llm_ms)  # Function-calling round trip picks the tool
+    if mode == "rich":
+        return await stub_llm(llm_ms, "Sure! Here is what I found.")
+    return render_response(template, locale, **values)
+
+
+async def run_mode(mode: str, n: int, llm_ms: float) -> list:
+    timings = []
+    locales = list(TEMPLATES)
+    for i in range(n):
+        template, values = TOOL_REPLIES[i % len(TOOL_REPLIES)]
+        started = time.perf_counter()
+        await chat_request(mode, template, values, locales[i % len(locales)], llm_ms)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def summarize(label: str, timings: list) -> float:
+    ms = sorted(x * 1000 for x in timings)
+    mean = statistics.mean(ms)
+    print(f"{label:<10} mean={mean:8.1f}ms p50={ms[len(ms) // 2]:8.1f}ms p99={ms[int(len(ms) * 0.99) - 1]:8.1f}ms")
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-ms", type=float, default=800, help="Simulated Gemini round trip")
+    parser.add_argument("-n", type=int, default=20, help="Chat requests per mode")
+    args = parser.parse_args()
+
+    random.seed(0)
+    render_runs = 100_000
+    started = time.perf_counter()
+    for i in range(render_runs):
+        template, values = TOOL_REPLIES[i % len(TOOL_REPLIES)]
+        render_response(template, "en-US", **values)
+    print(f"render_response {(time.perf_counter() - started) / render_runs * 1e6:6.2f}us per reply")
+
+    rich = summarize("rich", asyncio.run(run_mode("rich", args.n, args.llm_ms)))
+    template = summarize("template", asyncio.run(run_mode("template", args.n, args.llm_ms)))
+    print(f"saving     {rich - template:8.1f}ms per request ({rich / template:.2f}x), one Gemini call instead of two")
+
+
+if __name__ == "__main__":
+    main()
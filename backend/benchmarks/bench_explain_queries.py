@@ -0,0 +1,120 @@
+# benchmarks/bench_explain_queries.py
+"""
+EXPLAIN ANALYZE the backend's hot queries, optionally before and after applying
+the index migration (db/postgres/init/07_indexes.sql).
+
+Covers the queries in sql_extraction.py, sql_extract_monthly_sales.py,
+get_customers_sql.py and the forecast loaders, using the exact SQL the app runs.
+
+    python -m benchmarks.bench_explain_queries --merchant 1d4f3             # current state
+    python -m benchmarks.bench_explain_queries --merchant 1d4f3 --migrate   # before / migrate / after
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import text
+
+from db.database import engine
+from forecasts.forecast_qty import TRAINING_DATA_QUERY
+from forecasts.forecast_sales import DAILY_SALES_QUERY
+from sql_scripts.get_customers_sql import get_customers_sql
+from sql_scripts.sql_extract_monthly_sales import MONTHLY_SALES_QUERY
+from sql_scripts.sql_extraction import ITEM_QUANTITIES_QUERY
+
+DEFAULT_MIGRATION = os.path.join(
+    os.path.dirname(__file__), "..", "..", "db", "postgres", "init", "07_indexes.sql"
+)
+
+
+def benchmark_queries(merchant_id: str) -> dict:
+    """name -> (sql, params) for every query under test."""
+    return {
+        "actual_quantities (30d)": (ITEM_QUANTITIES_QUERY, {
+            "merchant_id": merchant_id,
+            "start_date": datetime(2023, 12, 2),
+            "end_date": datetime(2023, 12, 31, 23, 59, 59),
+        }),
+        "monthly_sales": (MONTHLY_SALES_QUERY, {"merchant_id": merchant_id}),
+        "customers": get_customers_sql(merchant_id),
+        "customers (30d, first page)": get_customers_sql(merchant_id, days_ago=30, limit=50),
+        "forecast_qty training load": (TRAINING_DATA_QUERY, {
+            "merchant_id": merchant_id,
+            "end_time": datetime(2023, 12, 1),
+        }),
+        "forecast_sales daily load": (DAILY_SALES_QUERY, {"merchant_id": merchant_id}),
+    }
+
+
+def explain(conn, sql: str, params: dict) -> dict:
+    sql = sql.strip().rstrip(";")
+    plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    plan = plan[0]
+
+    def node_types(node):
+        yield node["Node Type"] + (f" on {node['Relation Name']}" if "Relation Name" in node else "")
+        for child in node.get("Plans", []):
+            yield from node_types(child)
+
+    scans = [n for n in node_types(plan["Plan"]) if "Scan" in n]
+    return {
+        "planning_ms": plan["Planning Time"],
+        "execution_ms": plan["Execution Time"],
+        "shared_blocks": plan["Plan"].get("Shared Hit Blocks", 0) + plan["Plan"].get("Shared Read Blocks", 0),
+        "scans": scans,
+    }
+
+
+def run_all(merchant_id: str, repeat: int) -> dict:
+    results = {}
+    with engine.connect() as conn:
+        conn.execute(text("SET statement_timeout = 0"))
+        for name, (sql, params) in benchmark_queries(merchant_id).items():
+            runs = [explain(conn, sql, params) for _ in range(repeat)]
+            best = min(runs, key=lambda r: r["execution_ms"])
+            results[name] = best
+            print(f"  {name:<28} exec={best['execution_ms']:9.2f}ms plan={best['planning_ms']:7.2f}ms "
+                  f"blocks={best['shared_blocks']:>8}")
+            for scan in best["scans"]:
+                print(f"      {scan}")
+    return results
+
+
+def apply_migration(path: str):
+    with open(path) as f:
+        sql = f.read()
+    with engine.begin() as conn:
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        conn.exec_driver_sql(sql)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--merchant", required=True, help="merchant_id to run the queries for")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query (best is reported)")
+    parser.add_argument("--migrate", action="store_true", help="Apply the migration between two passes")
+    parser.add_argument("--migration", default=DEFAULT_MIGRATION, help="Migration SQL file")
+    args = parser.parse_args()
+
+    print("Before:" if args.migrate else "Current:")
+    before = run_all(args.merchant, args.repeat)
+    if not args.migrate:
+        return
+
+    print(f"\nApplying {os.path.normpath(args.migration)} ...")
+    apply_migration(args.migration)
+
+    print("\nAfter:")
+    after = run_all(args.merchant, args.repeat)
+
+    print("\nSpeedup (execution time):")
+    for name in before:
+        b, a = before[name]["execution_ms"], after[name]["execution_ms"]
+        print(f"  {name:<28} {b:9.2f}ms -> {a:9.2f}ms  ({b / a if a else float('inf'):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
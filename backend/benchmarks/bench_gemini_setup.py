@@ -0,0 +1,74 @@
+# benchmarks/bench_gemini_setup.py
+"""
+Microbenchmark: per-request Gemini setup cost before and after sharing the
+model objects (ai/gemini.py).
+
+"per request" is what /api/chat and chatFunctionHelper used to do on every call:
+read the prompt file and construct a GenerativeModel, then start the chat session.
+"shared" asks gemini_models for the prebuilt model (one stat() of the prompt file)
+and starts the session. The API is stubbed with a dummy key: nothing is sent, so
+only the local overhead is measured.
+
+    python -m benchmarks.bench_gemini_setup -n 5000
+"""
+import argparse
+import statistics
+import time
+
+import google.generativeai as genai
+
+from ai.gemini import CHAT_PROMPT, GEMINI_MODEL_NAME, HELPER_PROMPT, PROMPTS_DIR, gemini_models
+from ai.tools import gemini_function_declarations
+
+
+def per_request_setup():
+    chat_model = genai.GenerativeModel(
+        model_name=GEMINI_MODEL_NAME,
+        tools=gemini_function_declarations,
+        system_instruction=open(f"{PROMPTS_DIR}/{CHAT_PROMPT}", "r").read()
+    )
+    helper_model = genai.GenerativeModel(
+        model_name=GEMINI_MODEL_NAME,
+        system_instruction=open(f"{PROMPTS_DIR}/{HELPER_PROMPT}", "r").read()
+    )
+    chat_model.start_chat(history=[])
+    helper_model.start_chat(history=[])
+
+
+def shared_setup():
+    gemini_models.chat_model().start_chat(history=[])
+    gemini_models.helper_model().start_chat(history=[])
+
+
+def time_calls(fn, n: int) -> list:
+    timings = []
+    for _ in range(n):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def summarize(label: str, timings: list) -> float:
+    us = sorted(x * 1e6 for x in timings)
+    mean = statistics.mean(us)
+    print(f"{label:<12} mean={mean:9.1f}us p50={us[len(us) // 2]:9.1f}us p99={us[int(len(us) * 0.99) - 1]:9.1f}us")
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=2000, help="Simulated requests per scenario")
+    args = parser.parse_args()
+
+    genai.configure(api_key="stub-key")  # Never used: no request leaves the process
+    shared_setup()  # Build the shared models once, as the lifespan hook does
+
+    before = summarize("per request", time_calls(per_request_setup, args.n))
+    after = summarize("shared", time_calls(shared_setup, args.n))
+    print(f"saving       {before - after:9.1f}us per chat request ({before / after:.1f}x less setup)")
+    print(f"model builds {gemini_models.builds}, prompt reloads {gemini_models.prompts.reloads}")
+
+
+if __name__ == "__main__":
+    main()
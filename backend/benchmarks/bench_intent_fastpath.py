@@ -0,0 +1,100 @@
+# benchmarks/bench_intent_fastpath.py
+"""
+Microbenchmark: time until /api/chat knows which tool to run, with and without
+the local intent fast path (ai/intents.py).
+
+Gemini is replaced by a stub that sleeps --llm-ms (jittered by +/-25%) and returns
+a function call, so the numbers isolate the routing step: "gemini only" awaits the
+stub for every message, "fast path" runs match_intent() first and only awaits the
+stub for messages it declines. The tool itself runs the same in both cases and is
+not included. The corpus mixes fast-path phrasings with ones that must fall back.
+
+    python -m benchmarks.bench_intent_fastpath --llm-ms 800 --rounds 5
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from ai.intents import match_intent
+
+CORPUS = [
+    "what are my sales for the next two weeks",
+    "forecast sales for tomorrow",
+    "what will my revenue be over the next 10 days?",
+    "how many units will I sell next fortnight",
+    "forecasted quantities for the coming week",
+    "how many items did I sell in the past month",
+    "quantities sold over the last 3 days",
+    "show customers who ordered in the last 30 days",
+    "show my customers",
+    "list customers from the last 2 weeks",
+    # Ambiguous or conversational: must go to Gemini
+    "why are sales down next week",
+    "compare my sales this week versus last week",
+    "yes, send them",
+    "hello! what can you do?",
+    "how many customers do I have",
+    "which dish should I promote on weekends",
+    "show customers who haven't ordered in 30 days",
+]
+
+
+async def stub_llm(message: str, llm_ms: float):
+    """Stands in for the Gemini function-calling round trip."""
+    await asyncio.sleep(llm_ms * random.uniform(0.75, 1.25) / 1000)
+    return {"name": "calculate_total_sales", "args": {"days": 7}}
+
+
+async def route_gemini_only(message: str, llm_ms: float):
+    return await stub_llm(message, llm_ms)
+
+
+async def route_fast_path(message: str, llm_ms: float):
+    intent = match_intent(message)
+    if intent is not None:
+        return intent
+    return await stub_llm(message, llm_ms)
+
+
+async def time_routes(route, messages: list, llm_ms: float) -> list:
+    timings = []
+    for message in messages:
+        started = time.perf_counter()
+        await route(message, llm_ms)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def summarize(label: str, timings: list) -> float:
+    ms = sorted(x * 1000 for x in timings)
+    mean = statistics.mean(ms)
+    print(f"{label:<12} mean={mean:8.2f}ms p50={ms[len(ms) // 2]:8.2f}ms p90={ms[int(len(ms) * 0.9) - 1]:8.2f}ms")
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-ms", type=float, default=800, help="Simulated Gemini round trip")
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over the corpus")
+    args = parser.parse_args()
+
+    random.seed(0)
+    messages = CORPUS * args.rounds
+    hits = [m for m in CORPUS if match_intent(m) is not None]
+    print(f"{len(CORPUS)} messages, {len(hits)} handled locally ({len(hits) / len(CORPUS):.0%})")
+
+    parse_runs = 10_000
+    started = time.perf_counter()
+    for i in range(parse_runs):
+        match_intent(CORPUS[i % len(CORPUS)])
+    print(f"match_intent {(time.perf_counter() - started) / parse_runs * 1e6:8.1f}us per message")
+
+    before = summarize("gemini only", asyncio.run(time_routes(route_gemini_only, messages, args.llm_ms)))
+    after = summarize("fast path", asyncio.run(time_routes(route_fast_path, messages, args.llm_ms)))
+    print(f"saving       {before - after:8.2f}ms per message on average")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# benchmarks/bench_serialization.py
+"""
+Microbenchmark: DataFrame -> response encoding, the previous iterrows() code
+against the vectorized path in sql_scripts/serialization.py.
+
+Runs on synthetic frames shaped like the /api/actual_quantities query result and
+the per-item quantity forecast (forecast_quantity step 9). No database needed.
+Times include encoding the body to bytes, as FastAPI would before sending it.
+
+    python -m benchmarks.bench_serialization                      # 10k and 1M rows
+    python -m benchmarks.bench_serialization --sizes 10000 --repeat 5
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecasts.forecast_qty import format_quantity_forecast, sanitize_key_name
+from sql_scripts.serialization import to_arrow_ipc, to_columns, to_records
+from sql_scripts.sql_extraction import ITEM_QUANTITY_CASTS, ITEM_QUANTITY_COLUMNS, ItemQuantity, QuantitiesResponse
+
+ENVELOPE = {"days": 30, "start_date": "2023-12-02", "end_date": "2023-12-31"}
+
+
+def quantities_frame(n: int, rng) -> pd.DataFrame:
+    return pd.DataFrame({
+        "item_id": np.arange(n),
+        "item_name": [f"Item {i % 500} (Large)" for i in range(n)],
+        "total_quantity": rng.integers(1, 500, n),
+        "total_sales": rng.random(n) * 1000,
+    })
+
+
+def forecast_frame(n: int, rng) -> pd.DataFrame:
+    days = 30
+    items = max(1, n // days)
+    return pd.DataFrame({
+        "order_date": np.repeat(pd.date_range("2023-12-01", periods=days), items)[:n],
+        "item_id": np.tile(np.arange(items), days)[:n],
+        "item_name": np.tile([f"Nasi Lemak #{i}" for i in range(items)], days)[:n],
+        "predicted_quantity": rng.integers(0, 50, n),
+    })
+
+
+# --- Previous implementations, kept here for comparison ---
+def legacy_quantities(df: pd.DataFrame) -> bytes:
+    items_list = [
+        ItemQuantity(
+            item_name=row['item_name'],
+            total_quantity=int(row['total_quantity']),
+            total_sales=float(row['total_sales'])
+        )
+        for _, row in df.iterrows()
+    ]
+    return QuantitiesResponse(**ENVELOPE, items=items_list).model_dump_json().encode()
+
+
+def legacy_format_forecast(df: pd.DataFrame) -> bytes:
+    output = []
+    for date, group in df.groupby('order_date'):
+        record = {"order_date": date.strftime('%Y-%m-%d')}
+        for _, row in group.iterrows():
+            record[f"{sanitize_key_name(row['item_name'])}_pred"] = row["predicted_quantity"]
+        output.append(record)
+    return json.dumps({"future_forecast_by_name": output}, default=int).encode()
+
+
+# --- Current implementations ---
+def records_quantities(df: pd.DataFrame) -> bytes:
+    # Plain dict validated against the response_model, like the endpoint's "json" format
+    body = {**ENVELOPE, "items": to_records(df, ITEM_QUANTITY_COLUMNS, ITEM_QUANTITY_CASTS)}
+    return QuantitiesResponse.model_validate(body).model_dump_json().encode()
+
+
+def columnar_quantities(df: pd.DataFrame) -> bytes:
+    return json.dumps({**ENVELOPE, "items": to_columns(df, ITEM_QUANTITY_COLUMNS, ITEM_QUANTITY_CASTS)}).encode()
+
+
+def arrow_quantities(df: pd.DataFrame) -> bytes:
+    return to_arrow_ipc(df, ITEM_QUANTITY_COLUMNS, ITEM_QUANTITY_CASTS, metadata=ENVELOPE)
+
+
+def vectorized_format_forecast(df: pd.DataFrame) -> bytes:
+    return json.dumps(format_quantity_forecast("bench", df)).encode()
+
+
+def best_of(fn, df, repeat: int) -> tuple[float, int]:
+    timings, size = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(fn(df))
+        timings.append(time.perf_counter() - started)
+    return min(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,1000000", help="Comma-separated row counts")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (best is reported)")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    cases = [
+        ("actual_quantities", quantities_frame, [
+            ("iterrows + Pydantic", legacy_quantities),
+            ("records (json)", records_quantities),
+            ("columnar", columnar_quantities),
+            ("arrow ipc", arrow_quantities),
+        ]),
+        ("forecast step 9", forecast_frame, [
+            ("iterrows", legacy_format_forecast),
+            ("vectorized", vectorized_format_forecast),
+        ]),
+    ]
+    for n in (int(size) for size in args.sizes.split(",")):
+        for name, make_frame, variants in cases:
+            df = make_frame(n, rng)
+            print(f"{name} ({n:,} rows)")
+            baseline = None
+            for label, fn in variants:
+                seconds, size = best_of(fn, df, args.repeat)
+                baseline = baseline or seconds
+                print(f"  {label:<22} {seconds * 1000:10.1f}ms {size / 1e6:8.2f}MB  ({baseline / seconds:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
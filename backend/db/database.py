@@ -1,17 +1,98 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
+import pandas as pd
+import polars as pl
 import os
 
 load_dotenv()
-DB_USER = os.getenv("DB_USER")
-DB_PASS = os.getenv("DB_PASS")
-DB_HOST = os.getenv("DB_HOST")
-DB_NAME = os.getenv("DB_NAME")
 
-DATABASE_URL = f'postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}'
 
-engine = create_engine(DATABASE_URL)
+def _database_url() -> str:
+    # DATABASE_URI wins if set; otherwise build it from the DB_* variables (.env / docker-compose)
+    uri = os.getenv("DATABASE_URI")
+    if uri:
+        return uri
+    db_user = os.getenv("DB_USER") or "postgres"
+    db_pass = os.getenv("DB_PASS") or os.getenv("DB_PASSWORD") or "nttc4"
+    db_host = os.getenv("DB_HOST") or "localhost"
+    db_port = os.getenv("DB_PORT") or "5432"
+    db_name = os.getenv("DB_NAME") or "postgres"
+    return f'postgresql://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}'
+
+
+DATABASE_URL = _database_url()
+
+# Connection pool tuning
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))       # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))     # seconds before a connection is replaced
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+# The one engine every endpoint, forecaster and script shares
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=True,  # Drop dead connections (DB restart, idle timeout) before handing them out
+    connect_args={"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"},
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async twin (asyncpg) for the async routes, so DB round-trips don't block the event loop
+ASYNC_DATABASE_URL = make_url(DATABASE_URL).set(drivername="postgresql+asyncpg")
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+    connect_args={"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}},
+)
+# expire_on_commit=False: returned ORM objects stay readable after the session closes
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
+
+
+# --- Data access helpers ---
+def read_polars(query: str, params: dict | None = None) -> pl.DataFrame:
+    """Run a (parameterized) query on a pooled connection and return a Polars DataFrame."""
+    with engine.connect() as conn:
+        return pl.read_database(text(query), connection=conn, execute_options={"parameters": params or {}})
+
+
+def read_pandas(query: str, params: dict | None = None) -> pd.DataFrame:
+    """Run a (parameterized) query on a pooled connection and return a pandas DataFrame."""
+    with engine.connect() as conn:
+        return pd.read_sql_query(text(query), conn, params=params or {})
+
+
+async def read_pandas_async(query: str, params: dict | None = None) -> pd.DataFrame:
+    """Async variant of read_pandas on the asyncpg pool."""
+    async with async_engine.connect() as conn:
+        result = await conn.execute(text(query), params or {})
+        return pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+
+def _pool_stats(pool) -> dict:
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+
+def pool_stats() -> dict:
+    return {
+        "sync": _pool_stats(engine.pool),
+        "async": _pool_stats(async_engine.pool),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "statement_timeout_ms": DB_STATEMENT_TIMEOUT_MS,
+    }
@@ -0,0 +1,149 @@
+# forecasts/batch.py
+"""
+Offline batch forecasting job.
+
+Runs the sales (SARIMA) and quantity (XGBoost) forecasts for every merchant in the
+`merchants` table across a process pool and writes the results to the
+`sales_forecasts` / `item_forecasts` tables, together with the data watermark each
+forecast was computed from. /api/forecast_sales, /api/forecast_quantity and the chat
+tools read those rows for as long as that watermark is current (forecasts/precomputed.py).
+
+Usage (from the backend directory):
+    python -m forecasts.batch                      # all merchants
+    python -m forecasts.batch --workers 4          # limit the pool size
+    python -m forecasts.batch --merchant 1d4f3 ... # only some merchants
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from db.database import engine
+from forecasts.forecast_qty import QUANTITY_TRAINING_CUTOFF, build_quantity_forecast, get_quantity_watermark
+from forecasts.forecast_sales import build_sales_forecast, get_sales_watermark
+from forecasts.precomputed import encode_watermark
+from forecasts.rollups import refresh_merchant_daily_sales
+
+
+def _init_worker():
+    # Connections pooled by the parent must not be shared across the fork
+    engine.dispose(close=False)
+
+
+def _error_detail(e: Exception) -> str:
+    return e.detail if isinstance(e, HTTPException) else f"{type(e).__name__} - {e}"
+
+
+def forecast_merchant(merchant_id: str) -> dict:
+    """
+    Run both forecasts for one merchant (executed inside a pool worker).
+
+    Returns:
+        Dictionary with the rows to insert into each table and any per-model errors.
+    """
+    result = {"merchant_id": merchant_id, "sales_rows": [], "item_rows": [], "errors": []}
+
+    # Watermarks are read before fitting: orders arriving meanwhile make the stored rows stale, never wrongly fresh
+    try:
+        watermark = encode_watermark(get_sales_watermark(merchant_id))
+        sales = build_sales_forecast(merchant_id)
+        result["sales_rows"] = [
+            {
+                "merchant_id": merchant_id,
+                "forecast_date": day["forecast_date"].date(),
+                "forecasted_revenue": float(day["forecasted_revenue"]),
+                "watermark": watermark,
+            }
+            for day in sales["future_forecast"]
+        ]
+    except Exception as e:
+        result["errors"].append(f"sales: {_error_detail(e)}")
+
+    try:
+        watermark = encode_watermark(get_quantity_watermark(merchant_id, QUANTITY_TRAINING_CUTOFF))
+        items = build_quantity_forecast(merchant_id)
+        result["item_rows"] = [
+            {
+                "merchant_id": merchant_id,
+                "forecast_date": order_date.date(),
+                "item_id": int(item_id),
+                "item_name": item_name,
+                "predicted_quantity": int(qty),
+                "watermark": watermark,
+            }
+            for order_date, item_id, item_name, qty in zip(
+                items["order_date"], items["item_id"], items["item_name"], items["predicted_quantity"]
+            )
+        ]
+    except Exception as e:
+        result["errors"].append(f"quantity: {_error_detail(e)}")
+
+    return result
+
+
+def store_forecasts(result: dict):
+    """Replace a merchant's stored forecasts with the freshly computed rows (one transaction)."""
+    merchant_id = result["merchant_id"]
+    with engine.begin() as conn:
+        if result["sales_rows"]:
+            conn.execute(text("DELETE FROM sales_forecasts WHERE merchant_id = :merchant_id"),
+                         {"merchant_id": merchant_id})
+            conn.execute(text("""
+                INSERT INTO sales_forecasts (merchant_id, forecast_date, forecasted_revenue, watermark)
+                VALUES (:merchant_id, :forecast_date, :forecasted_revenue, :watermark)
+            """), result["sales_rows"])
+        if result["item_rows"]:
+            conn.execute(text("DELETE FROM item_forecasts WHERE merchant_id = :merchant_id"),
+                         {"merchant_id": merchant_id})
+            conn.execute(text("""
+                INSERT INTO item_forecasts (merchant_id, forecast_date, item_id, item_name, predicted_quantity, watermark)
+                VALUES (:merchant_id, :forecast_date, :item_id, :item_name, :predicted_quantity, :watermark)
+            """), result["item_rows"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute sales and item forecasts for all merchants.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--merchant", action="append", dest="merchants",
+                        help="Only forecast this merchant_id (repeatable)")
+    args = parser.parse_args()
+
+    merchant_ids = args.merchants
+    if not merchant_ids:
+        with engine.connect() as conn:
+            merchant_ids = [row[0] for row in conn.execute(text("SELECT merchant_id FROM merchants ORDER BY merchant_id"))]
+
+    # Fold newly ingested orders into the daily rollup once, before the workers read it
+    print(f"Refreshed {refresh_merchant_daily_sales()} merchant_daily_sales rows.")
+
+    print(f"Forecasting {len(merchant_ids)} merchants with {args.workers} workers...")
+    started = time.perf_counter()
+    failed = 0
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(forecast_merchant, merchant_id): merchant_id for merchant_id in merchant_ids}
+        for done, future in enumerate(as_completed(futures), start=1):
+            merchant_id = futures[future]
+            try:
+                result = future.result()
+                store_forecasts(result)
+            except Exception as e:
+                failed += 1
+                print(f"[{done}/{len(futures)}] {merchant_id}: failed - {type(e).__name__} - {e}")
+                continue
+            if result["errors"]:
+                failed += 1
+                print(f"[{done}/{len(futures)}] {merchant_id}: partial - {'; '.join(result['errors'])}")
+            else:
+                print(f"[{done}/{len(futures)}] {merchant_id}: {len(result['sales_rows'])} sales rows, "
+                      f"{len(result['item_rows'])} item rows")
+
+    print(f"Done in {time.perf_counter() - started:.1f}s ({failed} merchants with errors).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# forecasts/executor.py
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+# How many forecasts may run at once, and how long a request may wait for a free slot
+FORECAST_MAX_WORKERS = int(os.getenv("FORECAST_MAX_WORKERS", "2"))
+FORECAST_QUEUE_TIMEOUT = float(os.getenv("FORECAST_QUEUE_TIMEOUT", "30"))
+
+# Model fitting (statsmodels / XGBoost) spends most of its time in native code that
+# releases the GIL, so a small thread pool keeps it off the event loop without the
+# pickling constraints of a process pool (Merchant ORM objects, cached models).
+_executor = ThreadPoolExecutor(max_workers=FORECAST_MAX_WORKERS, thread_name_prefix="forecast")
+_slots = asyncio.Semaphore(FORECAST_MAX_WORKERS)
+_waiting = 0
+_running = 0
+
+
+async def run_forecast(fn, *args, **kwargs):
+    """
+    Run a blocking forecast function on the bounded forecast pool.
+
+    At most FORECAST_MAX_WORKERS calls run concurrently; further callers queue for
+    up to FORECAST_QUEUE_TIMEOUT seconds and then get a 503 instead of piling up.
+    """
+    global _waiting, _running
+    _waiting += 1
+    try:
+        await asyncio.wait_for(_slots.acquire(), timeout=FORECAST_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail="Forecasting is busy right now, please try again shortly.",
+            headers={"Retry-After": str(int(FORECAST_QUEUE_TIMEOUT))},
+        )
+    finally:
+        _waiting -= 1
+
+    _running += 1
+    loop = asyncio.get_running_loop()
+    try:
+        future = _executor.submit(functools.partial(fn, *args, **kwargs))
+    except BaseException:
+        _release_slot()
+        raise
+    # The slot is held until the pool thread is done, not until this caller stops waiting:
+    # a cancelled caller (client disconnect, aborted single-flight leader) can't stop the fit
+    future.add_done_callback(lambda _: _call_on_loop(loop, _release_slot))
+    result = asyncio.wrap_future(future, loop=loop)
+    result.add_done_callback(_consume_result)
+    return await asyncio.shield(result)
+
+
+def _release_slot():
+    global _running
+    _running -= 1
+    _slots.release()
+
+
+def _call_on_loop(loop: asyncio.AbstractEventLoop, callback):
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        pass  # Loop already closed (shutdown): nobody is left to hand the slot to
+
+
+def _consume_result(future: asyncio.Future):
+    # A fit whose caller was cancelled still finishes; its error is not "never retrieved"
+    if not future.cancelled():
+        future.exception()
+
+
+def executor_stats() -> dict:
+    return {
+        "max_workers": FORECAST_MAX_WORKERS,
+        "queue_timeout_seconds": FORECAST_QUEUE_TIMEOUT,
+        "running": _running,
+        "waiting": _waiting,
+    }
@@ -0,0 +1,272 @@
+# forecasts/global_qty.py
+"""
+One XGBoost quantity model for all merchants, trained offline.
+
+The per-merchant model in forecast_qty.py is refitted on every cache-less request,
+although its features (date parts + item) are generic. This module fits a single
+model over every merchant's daily item quantities, with merchant_id and item_id as
+categorical features, and saves it as a new version in the model registry. The API
+loads it once at startup, so a request only runs one predict over 30 x items rows.
+
+Train (from the backend directory):
+    python -m forecasts.global_qty                        # cutoff 2023-11-30
+    python -m forecasts.global_qty --cutoff 2023-10-31 --estimators 300
+"""
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+
+from db.database import read_pandas
+from forecasts.registry import ModelRegistry, model_registry
+
+# Registry entry of the global model (model type, merchant_id)
+GLOBAL_QTY_MODEL_TYPE = "global_xgboost"
+GLOBAL_QTY_MODEL_KEY = "all"
+GLOBAL_QTY_CUTOFF = "2023-11-30"
+# Threads one predict call may use; forecasts.executor runs up to FORECAST_MAX_WORKERS of them at once
+GLOBAL_QTY_PREDICT_THREADS = int(os.getenv("GLOBAL_QTY_PREDICT_THREADS", str(max(1, (os.cpu_count() or 1) // 2))))
+
+# Same date features as the per-merchant model, plus the merchant
+FEATURE_NAMES = ["weekday", "month", "day", "year", "day_of_year", "merchant_id", "item_id"]
+
+# Daily quantity per merchant and item, aggregated in the database (step 1-2 of forecast_qty)
+GLOBAL_TRAINING_QUERY = """
+SELECT
+    order_merchant_id AS merchant_id,
+    order_time::date AS order_date,
+    item_id,
+    item_name,
+    SUM(quantity)::INTEGER AS daily_quantity_sold
+FROM combined_order_view
+WHERE order_time < :end_time
+  AND item_id IS NOT NULL
+  AND item_name IS NOT NULL
+  AND quantity IS NOT NULL
+GROUP BY order_merchant_id, order_time::date, item_id, item_name
+"""
+
+
+def add_date_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Date part columns from order_date (weekday 1 = Monday, as in forecast_qty)."""
+    dates = df["order_date"].dt
+    return df.assign(
+        weekday=dates.weekday + 1,
+        month=dates.month,
+        day=dates.day,
+        year=dates.year,
+        day_of_year=dates.dayofyear,
+    )
+
+
+class GlobalQuantityModel:
+    """The fitted regressor plus what inference needs: category sets and each merchant's items."""
+
+    def __init__(self, model: XGBRegressor, merchant_categories: list, item_categories: list,
+                 items_by_merchant: dict, cutoff: str, trained_at: float, metrics: dict | None = None):
+        self.model = model
+        self.merchant_categories = merchant_categories
+        self.item_categories = item_categories
+        # merchant_id -> [[item_id, item_name], ...] seen before the cutoff
+        self.items_by_merchant = items_by_merchant
+        self.cutoff = cutoff
+        self.trained_at = trained_at
+        self.metrics = metrics or {}
+
+    def has_merchant(self, merchant_id: str) -> bool:
+        return merchant_id in self.items_by_merchant
+
+    def feature_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """FEATURE_NAMES columns of df with the training-time categories applied."""
+        df = df.assign(
+            merchant_id=pd.Categorical(df["merchant_id"], categories=self.merchant_categories),
+            item_id=pd.Categorical(df["item_id"], categories=self.item_categories),
+        )
+        return df[FEATURE_NAMES]
+
+    def future_frame(self, merchant_id: str, days: int) -> pd.DataFrame:
+        """(order_date, merchant_id, item_id, item_name) for every known item over the days after the cutoff."""
+        items = self.items_by_merchant[merchant_id]
+        future_dates = pd.date_range(start=pd.Timestamp(self.cutoff) + pd.Timedelta(days=1), periods=days, freq="D")
+        item_ids = [item_id for item_id, _ in items]
+        item_names = [item_name for _, item_name in items]
+        return pd.DataFrame({
+            "order_date": np.repeat(future_dates, len(items)),
+            "merchant_id": merchant_id,
+            "item_id": np.tile(item_ids, days),
+            "item_name": np.tile(item_names, days),
+        })
+
+    def batch_future_frame(self, merchant_ids: list, days: int) -> pd.DataFrame:
+        """future_frame for several merchants at once, built column-wise into one frame."""
+        future_dates = pd.date_range(start=pd.Timestamp(self.cutoff) + pd.Timedelta(days=1), periods=days, freq="D")
+        items = [self.items_by_merchant[merchant_id] for merchant_id in merchant_ids]
+        counts = [len(merchant_items) for merchant_items in items]
+        if not sum(counts):
+            return pd.DataFrame(columns=["order_date", "merchant_id", "item_id", "item_name"])
+        return pd.DataFrame({
+            "order_date": np.concatenate([np.repeat(future_dates, count) for count in counts]),
+            "merchant_id": np.repeat(merchant_ids, [count * days for count in counts]),
+            "item_id": np.concatenate([np.tile([item_id for item_id, _ in m], days) for m in items if m]),
+            "item_name": np.concatenate([np.tile([item_name for _, item_name in m], days) for m in items if m]),
+        })
+
+    def predict_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """Rounded, non-negative quantities for rows with order_date, merchant_id and item_id."""
+        preds = self.model.predict(self.feature_frame(add_date_features(df)))
+        return np.maximum(0, np.round(preds)).astype(int)
+
+    def predict_merchant(self, merchant_id: str, days: int) -> pd.DataFrame:
+        """Same shape as forecast_qty.build_quantity_forecast: order_date, item_id, item_name, predicted_quantity."""
+        future_df = self.future_frame(merchant_id, days)
+        future_df["predicted_quantity"] = self.predict_frame(future_df)
+        return future_df[["order_date", "item_id", "item_name", "predicted_quantity"]]
+
+    def predict_merchants(self, merchant_ids: list, days: int) -> dict[str, pd.DataFrame]:
+        """
+        Forecast many merchants with one feature matrix and a single predict call.
+
+        Returns:
+            merchant_id -> predict_merchant-shaped DataFrame, for the merchants the model knows.
+        """
+        known = [merchant_id for merchant_id in dict.fromkeys(merchant_ids) if self.has_merchant(merchant_id)]
+        future_df = self.batch_future_frame(known, days)
+        if future_df.empty:
+            return {}
+        future_df["predicted_quantity"] = self.predict_frame(future_df)
+        columns = ["order_date", "item_id", "item_name", "predicted_quantity"]
+        return {merchant_id: group[columns] for merchant_id, group in future_df.groupby("merchant_id", sort=False)}
+
+    def info(self) -> dict:
+        return {
+            "cutoff": self.cutoff,
+            "trained_at": self.trained_at,
+            "merchants": len(self.items_by_merchant),
+            "items": len(self.item_categories),
+            "predict_threads": self.model.get_params().get("n_jobs"),
+            "metrics": self.metrics,
+        }
+
+    def save(self, registry: ModelRegistry = model_registry) -> dict:
+        """Store as a new version of the global model in the registry (atomic, see registry.py)."""
+        return registry.save(
+            GLOBAL_QTY_MODEL_TYPE, GLOBAL_QTY_MODEL_KEY,
+            {
+                "model": self.model,
+                "feature_names": FEATURE_NAMES,
+                "merchant_categories": self.merchant_categories,
+                "item_categories": self.item_categories,
+                "items_by_merchant": self.items_by_merchant,
+                "trained_at": self.trained_at,
+            },
+            training_cutoff=self.cutoff,
+            metrics=self.metrics,
+        )
+
+    @classmethod
+    def load(cls, registry: ModelRegistry = model_registry) -> "GlobalQuantityModel | None":
+        """The newest registered version, or None if the model has not been trained yet."""
+        loaded = registry.load(GLOBAL_QTY_MODEL_TYPE, GLOBAL_QTY_MODEL_KEY)
+        if loaded is None:
+            return None
+        value, meta = loaded
+        if value["feature_names"] != FEATURE_NAMES:
+            raise ValueError(f"Global model v{meta['version']} was trained on different features: {value['feature_names']}")
+        # Serving: cap the threads each predict call uses
+        value["model"].set_params(n_jobs=GLOBAL_QTY_PREDICT_THREADS)
+        return cls(
+            value["model"],
+            merchant_categories=value["merchant_categories"],
+            item_categories=value["item_categories"],
+            items_by_merchant=value["items_by_merchant"],
+            cutoff=meta["training_cutoff"],
+            trained_at=value["trained_at"],
+            metrics=meta["metrics"],
+        )
+
+
+def train_global_quantity_model(cutoff: str = GLOBAL_QTY_CUTOFF, n_estimators: int = 300) -> GlobalQuantityModel:
+    """Fit the global model on every merchant's daily item quantities up to and including `cutoff`."""
+    cutoff_ts = pd.Timestamp(cutoff)
+    print(f"Loading daily item quantities up to {cutoff_ts.strftime('%Y-%m-%d')}...")
+    daily = read_pandas(GLOBAL_TRAINING_QUERY, {"end_time": cutoff_ts + pd.Timedelta(days=1)})
+    if daily.empty:
+        raise ValueError(f"No order data found before {cutoff_ts.strftime('%Y-%m-%d')}")
+    daily["order_date"] = pd.to_datetime(daily["order_date"])
+    daily["item_id"] = daily["item_id"].astype(int)
+    daily = add_date_features(daily)
+
+    merchant_categories = sorted(daily["merchant_id"].unique().tolist())
+    item_categories = sorted(daily["item_id"].unique().tolist())
+    items = daily[["merchant_id", "item_id", "item_name"]].drop_duplicates(["merchant_id", "item_id"]).sort_values(["merchant_id", "item_id"])
+    items_by_merchant = {
+        merchant_id: [[item_id, item_name] for item_id, item_name in zip(group["item_id"].tolist(), group["item_name"].tolist())]
+        for merchant_id, group in items.groupby("merchant_id")
+    }
+
+    model = XGBRegressor(
+        n_estimators=n_estimators,
+        random_state=42,
+        enable_categorical=True,
+        tree_method="hist",
+        objective="reg:squarederror",
+    )
+    wrapper = GlobalQuantityModel(model, merchant_categories, item_categories, items_by_merchant,
+                                  cutoff=cutoff_ts.strftime("%Y-%m-%d"), trained_at=time.time())
+    X_train = wrapper.feature_frame(daily)
+    y_train = daily["daily_quantity_sold"]
+
+    print(f"Fitting global XGBoost model on {len(y_train)} rows "
+          f"({len(merchant_categories)} merchants, {len(item_categories)} items)...")
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_rmse = float(np.sqrt(np.mean((model.predict(X_train) - y_train) ** 2)))
+    wrapper.metrics = {"train_rows": int(len(y_train)), "train_rmse": train_rmse,
+                       "fit_seconds": time.perf_counter() - started}
+    print(f"Model fitting complete ({wrapper.metrics['fit_seconds']:.1f}s, train RMSE {train_rmse:.3f}).")
+    return wrapper
+
+
+# --- Process-wide instance, loaded once at startup ---
+_global_model: GlobalQuantityModel | None = None
+_global_model_lock = threading.Lock()
+
+
+def load_global_quantity_model(registry: ModelRegistry = model_registry) -> GlobalQuantityModel | None:
+    """Load the trained model from the registry (None if it has not been trained yet)."""
+    global _global_model
+    try:
+        model = GlobalQuantityModel.load(registry)
+    except Exception as e:
+        print(f"Warning: could not load the global quantity model: {e}")
+        return None
+    if model is None:
+        print("No global quantity model registered; run `python -m forecasts.global_qty` to train one.")
+        return None
+    with _global_model_lock:
+        _global_model = model
+    print(f"Loaded global quantity model (cutoff {model.cutoff}, {len(model.items_by_merchant)} merchants).")
+    return model
+
+
+def get_global_quantity_model() -> GlobalQuantityModel | None:
+    return _global_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cutoff", default=GLOBAL_QTY_CUTOFF, help="Last day of training data (YYYY-MM-DD)")
+    parser.add_argument("--estimators", type=int, default=300, help="Number of boosting rounds")
+    args = parser.parse_args()
+
+    wrapper = train_global_quantity_model(args.cutoff, args.estimators)
+    meta = wrapper.save()
+    print(f"Saved global quantity model as version {meta['version']} in the model registry.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# forecasts/model_cache.py
+import os
+import threading
+from collections import OrderedDict
+
+from forecasts.registry import ModelRegistry, model_registry, normalize_watermark
+
+# How many fitted models stay in memory per cache; the registry keeps them on disk
+CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", "64"))
+
+
+class ModelCache:
+    """
+    LRU cache of fitted forecasting models, keyed by merchant.
+
+    Every entry remembers the data watermark (e.g. max order_time + row count) it was
+    fitted on. A lookup with a different watermark counts as a miss, so the caller
+    refits only when new orders have arrived for that merchant. Entries are also
+    saved to the model registry (as model type `name`) and reloaded on a memory miss.
+    """
+
+    def __init__(self, name: str, max_entries: int = CACHE_SIZE, registry: ModelRegistry = model_registry):
+        self.name = name
+        self.max_entries = max_entries
+        self.registry = registry
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, merchant_id: str, watermark, value):
+        with self._lock:
+            self._entries[merchant_id] = (normalize_watermark(watermark), value)
+            self._entries.move_to_end(merchant_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, merchant_id: str, watermark):
+        """Return the cached value for merchant_id if it was fitted on `watermark`, else None."""
+        watermark = normalize_watermark(watermark)
+        with self._lock:
+            entry = self._entries.get(merchant_id)
+            if entry is not None and entry[0] == watermark:
+                self._entries.move_to_end(merchant_id)
+                self.hits += 1
+                hit = True
+            else:
+                hit = False
+        if hit:
+            self.registry.record_use(self.name, merchant_id)
+            return entry[1]
+
+        # Memory miss (or stale) - try the newest registry version, unless it is stale too
+        value = None
+        try:
+            latest = self.registry.latest(self.name, merchant_id)
+            if latest is not None and latest["watermark"] == watermark:
+                loaded = self.registry.load(self.name, merchant_id, latest["version"])
+                value = loaded[0] if loaded else None
+        except Exception as e:
+            print(f"Warning: could not load registered {self.name} model for merchant {merchant_id}: {e}")
+
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._remember(merchant_id, watermark, value)
+        with self._lock:
+            self.disk_hits += 1
+        return value
+
+    def put(self, merchant_id: str, watermark, value: dict, training_cutoff=None, metrics: dict | None = None):
+        """Store a freshly fitted value in memory and save it as a new registry version."""
+        self._remember(merchant_id, watermark, value)
+        try:
+            self.registry.save(self.name, merchant_id, value, watermark=watermark,
+                               training_cutoff=training_cutoff, metrics=metrics)
+        except Exception as e:
+            # The in-memory entry is still valid, we just lose persistence for it
+            print(f"Warning: could not save {self.name} model for merchant {merchant_id} to the registry: {e}")
+
+    def preload(self, merchant_id: str) -> bool:
+        """Load the newest registered version into memory (its watermark is checked on get)."""
+        loaded = self.registry.load(self.name, merchant_id, track_use=False)
+        if loaded is None:
+            return False
+        value, meta = loaded
+        self._remember(merchant_id, meta["watermark"], value)
+        return True
+
+    def invalidate(self, merchant_id: str):
+        with self._lock:
+            self._entries.pop(merchant_id, None)
+        self.registry.delete(self.name, merchant_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,31 @@
+# forecasts/precomputed.py
+"""
+When a forecast written by the batch job (sales_forecasts / item_forecasts) may still be served.
+
+The batch job stores the data watermark each forecast was computed from. The API serves
+the stored rows only while that watermark still matches the merchant's current one (no
+new orders folded into merchant_daily_sales since) and, if FORECAST_PRECOMPUTED_MAX_AGE
+is set, while they are younger than that many seconds. Otherwise the live path (model
+cache / global model / fit) answers.
+"""
+import json
+import os
+
+from forecasts.registry import normalize_watermark
+
+PRECOMPUTED_MAX_AGE = float(os.getenv("FORECAST_PRECOMPUTED_MAX_AGE", "0"))  # Seconds; 0 = no age limit
+
+# Selected next to the forecast columns; every row of one merchant's forecast carries the same values
+FRESHNESS_COLUMNS = "watermark, EXTRACT(EPOCH FROM NOW() - generated_at)::FLOAT AS age_seconds"
+
+
+def encode_watermark(watermark) -> str:
+    """The form stored in the watermark column."""
+    return json.dumps(normalize_watermark(watermark))
+
+
+def is_current(stored_watermark: str | None, age_seconds: float | None, watermark) -> bool:
+    """Whether a stored forecast was computed from `watermark` and is not older than allowed."""
+    if stored_watermark is None or json.loads(stored_watermark) != normalize_watermark(watermark):
+        return False
+    return not PRECOMPUTED_MAX_AGE or (age_seconds is not None and age_seconds <= PRECOMPUTED_MAX_AGE)
@@ -0,0 +1,323 @@
+# forecasts/registry.py
+"""
+Versioned on-disk registry of fitted forecasting models.
+
+Layout (under FORECAST_REGISTRY_DIR):
+
+    <model_type>/<merchant_id>/v<N>/meta.json     merchant, type, version, training cutoff,
+                                                 data watermark, metrics, artifact files
+    <model_type>/<merchant_id>/v<N>/<key>.ubj    XGBoost models (native UBJSON format)
+    <model_type>/<merchant_id>/v<N>/state.pkl    everything else (e.g. SARIMAX results)
+    index.json                                   all versions' metadata in one file
+    usage.json                                   load counts, used to preload the busiest merchants
+    .lock                                        flock held while index.json / usage.json are rewritten
+
+A version is written to a temporary directory and renamed into place, so readers
+only ever see complete versions; the newest version directory is the current model.
+index.json and usage.json are read-modify-written under an exclusive flock on .lock,
+so the batch job's worker processes don't overwrite each other's entries.
+
+Inspect it (from the backend directory):
+    python -m forecasts.registry                 # list the latest version of every model
+    python -m forecasts.registry --rebuild-index
+"""
+import argparse
+import fcntl
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import xgboost
+
+REGISTRY_DIR = os.getenv(
+    "FORECAST_REGISTRY_DIR", os.path.join(os.getenv("FORECAST_CACHE_DIR", "./.model_cache"), "registry")
+)
+REGISTRY_KEEP_VERSIONS = int(os.getenv("FORECAST_REGISTRY_KEEP_VERSIONS", "3"))
+# Flush load counts to usage.json after this many loads (and at shutdown)
+USAGE_FLUSH_EVERY = 100
+# Models of the most used merchants loaded into memory at API startup
+REGISTRY_PRELOAD = int(os.getenv("FORECAST_REGISTRY_PRELOAD", "32"))
+
+
+def normalize_watermark(watermark):
+    """The JSON form of a watermark, so in-memory and stored watermarks compare equal."""
+    return json.loads(json.dumps(watermark, default=str))
+
+
+def _load_xgboost(path: str, class_name: str):
+    """Load an XGBoost model from its JSON/UBJ file; XGBoost reads the file itself."""
+    model = getattr(xgboost, class_name)()
+    model.load_model(path)
+    return model
+
+
+class ModelRegistry:
+    def __init__(self, root: str = REGISTRY_DIR, keep_versions: int = REGISTRY_KEEP_VERSIONS):
+        self.root = root
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+        self._usage = Counter()
+        self._unflushed = 0
+
+    # --- Paths ---
+    def _model_dir(self, model_type: str, merchant_id: str) -> str:
+        return os.path.join(self.root, model_type, merchant_id)
+
+    def _versions(self, model_type: str, merchant_id: str) -> list[int]:
+        try:
+            names = os.listdir(self._model_dir(model_type, merchant_id))
+        except FileNotFoundError:
+            return []
+        return sorted(int(name[1:]) for name in names if name.startswith("v") and name[1:].isdigit())
+
+    def _write_json(self, path: str, data):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive across threads (self._lock) and across processes (flock on <root>/.lock)."""
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, ".lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_json(self, path: str, default=None):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    # --- Save / load ---
+    def save(self, model_type: str, merchant_id: str, value: dict, *, watermark=None,
+             training_cutoff=None, metrics: dict | None = None) -> dict:
+        """
+        Store `value` (a dict of model artifacts) as the next version of (model_type, merchant_id).
+        XGBoost models in it are saved as UBJ files, the remaining keys are pickled together.
+
+        Returns:
+            The version's metadata.
+        """
+        model_dir = self._model_dir(model_type, merchant_id)
+        os.makedirs(model_dir, exist_ok=True)
+        tmp_dir = os.path.join(model_dir, f".tmp-{os.getpid()}-{threading.get_ident()}")
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        xgb_artifacts, state = {}, {}
+        for key, item in value.items():
+            if isinstance(item, (xgboost.XGBModel, xgboost.Booster)):
+                item.save_model(os.path.join(tmp_dir, f"{key}.ubj"))
+                xgb_artifacts[key] = type(item).__name__
+            else:
+                state[key] = item
+        with open(os.path.join(tmp_dir, "state.pkl"), "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        # Claim the next version number; the rename fails if another writer got there first
+        while True:
+            versions = self._versions(model_type, merchant_id)
+            version = (versions[-1] + 1) if versions else 1
+            meta = {
+                "model_type": model_type,
+                "merchant_id": merchant_id,
+                "version": version,
+                "training_cutoff": training_cutoff,
+                "watermark": normalize_watermark(watermark),
+                "metrics": metrics or {},
+                "xgboost_artifacts": xgb_artifacts,
+                "created_at": time.time(),
+            }
+            self._write_json(os.path.join(tmp_dir, "meta.json"), meta)
+            try:
+                os.rename(tmp_dir, os.path.join(model_dir, f"v{version}"))
+                break
+            except OSError:
+                if not os.path.isdir(os.path.join(model_dir, f"v{version}")):
+                    raise
+
+        self._prune(model_type, merchant_id)
+        self._update_index(model_type, merchant_id)
+        return meta
+
+    def latest(self, model_type: str, merchant_id: str) -> dict | None:
+        """Metadata of the newest version, or None if nothing was saved."""
+        versions = self._versions(model_type, merchant_id)
+        if not versions:
+            return None
+        return self._read_json(os.path.join(self._model_dir(model_type, merchant_id), f"v{versions[-1]}", "meta.json"))
+
+    def load(self, model_type: str, merchant_id: str, version: int | None = None,
+             track_use: bool = True) -> tuple[dict, dict] | None:
+        """Return (value, metadata) of the given (default: newest) version, or None."""
+        if version is None:
+            versions = self._versions(model_type, merchant_id)
+            if not versions:
+                return None
+            version = versions[-1]
+        version_dir = os.path.join(self._model_dir(model_type, merchant_id), f"v{version}")
+        meta = self._read_json(os.path.join(version_dir, "meta.json"))
+        if meta is None:
+            return None
+
+        with open(os.path.join(version_dir, "state.pkl"), "rb") as f:
+            value = pickle.load(f)
+        for key, class_name in meta["xgboost_artifacts"].items():
+            value[key] = _load_xgboost(os.path.join(version_dir, f"{key}.ubj"), class_name)
+        if track_use:
+            self.record_use(model_type, merchant_id)
+        return value, meta
+
+    def delete(self, model_type: str, merchant_id: str):
+        shutil.rmtree(self._model_dir(model_type, merchant_id), ignore_errors=True)
+        self._update_index(model_type, merchant_id)
+
+    def _prune(self, model_type: str, merchant_id: str):
+        model_dir = self._model_dir(model_type, merchant_id)
+        for version in self._versions(model_type, merchant_id)[:-self.keep_versions]:
+            shutil.rmtree(os.path.join(model_dir, f"v{version}"), ignore_errors=True)
+
+    # --- Metadata index ---
+    def _index_path(self) -> str:
+        return os.path.join(self.root, "index.json")
+
+    def _update_index(self, model_type: str, merchant_id: str):
+        key = f"{model_type}/{merchant_id}"
+        model_dir = self._model_dir(model_type, merchant_id)
+        with self._locked():
+            # Versions are listed under the lock too, so a slower writer can't store a stale list
+            versions = [
+                self._read_json(os.path.join(model_dir, f"v{version}", "meta.json"))
+                for version in self._versions(model_type, merchant_id)
+            ]
+            index = self._read_json(self._index_path(), {})
+            if versions:
+                index[key] = [meta for meta in versions if meta]
+            else:
+                index.pop(key, None)
+            self._write_json(self._index_path(), index)
+
+    def index(self) -> dict:
+        """"<model_type>/<merchant_id>" -> metadata of every stored version."""
+        return self._read_json(self._index_path(), {})
+
+    def rebuild_index(self) -> dict:
+        """Re-create index.json from the version directories (e.g. after concurrent writers)."""
+        with self._locked():
+            index = self._scan_versions()
+            self._write_json(self._index_path(), index)
+        return index
+
+    def _scan_versions(self) -> dict:
+        index = {}
+        for model_type in sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []:
+            type_dir = os.path.join(self.root, model_type)
+            if not os.path.isdir(type_dir):
+                continue
+            for merchant_id in sorted(os.listdir(type_dir)):
+                versions = [
+                    self._read_json(os.path.join(type_dir, merchant_id, f"v{version}", "meta.json"))
+                    for version in self._versions(model_type, merchant_id)
+                ]
+                if any(versions):
+                    index[f"{model_type}/{merchant_id}"] = [meta for meta in versions if meta]
+        return index
+
+    # --- Usage tracking (for warm loading) ---
+    def _usage_path(self) -> str:
+        return os.path.join(self.root, "usage.json")
+
+    def record_use(self, model_type: str, merchant_id: str):
+        with self._lock:
+            self._usage[f"{model_type}/{merchant_id}"] += 1
+            self._unflushed += 1
+            flush = self._unflushed >= USAGE_FLUSH_EVERY
+        if flush:
+            self.flush_usage()
+
+    def flush_usage(self):
+        """Add the loads counted since the last flush to usage.json."""
+        if not self._unflushed:
+            return
+        try:
+            with self._locked():
+                if not self._unflushed:
+                    return
+                # Other processes flush to the same file; merge into what is on disk now
+                usage = Counter(self._read_json(self._usage_path(), {}))
+                usage.update(self._usage)
+                self._write_json(self._usage_path(), dict(usage))
+                self._usage.clear()
+                self._unflushed = 0
+        except Exception as e:
+            print(f"Warning: could not write model registry usage counts: {e}")
+
+    def most_used(self, n: int, model_type: str | None = None) -> list[tuple[str, str]]:
+        """The n most loaded (model_type, merchant_id) pairs, busiest first."""
+        usage = Counter(self._read_json(self._usage_path(), {}))
+        with self._lock:
+            usage.update(self._usage)
+        pairs = [tuple(key.split("/", 1)) for key, _ in usage.most_common()]
+        return [pair for pair in pairs if model_type is None or pair[0] == model_type][:n]
+
+    def stats(self) -> dict:
+        index = self.index()
+        return {
+            "root": self.root,
+            "models": len(index),
+            "versions": sum(len(versions) for versions in index.values()),
+            "keep_versions": self.keep_versions,
+        }
+
+
+# The one registry every cache, script and the batch job share
+model_registry = ModelRegistry()
+
+
+def preload_most_used(caches: list, n: int = REGISTRY_PRELOAD, registry: ModelRegistry = model_registry) -> int:
+    """
+    Warm the given ModelCaches with the registered models of the n most used
+    (model type, merchant) pairs, so a fresh worker serves them without fitting.
+
+    Returns:
+        Number of models loaded.
+    """
+    caches_by_type = {cache.name: cache for cache in caches}
+    loaded = 0
+    for model_type, merchant_id in registry.most_used(n * len(caches_by_type)):
+        cache = caches_by_type.get(model_type)
+        if cache is None or loaded >= n:
+            continue
+        try:
+            loaded += cache.preload(merchant_id)
+        except Exception as e:
+            print(f"Warning: could not preload {model_type} model for merchant {merchant_id}: {e}")
+    return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild-index", action="store_true", help="Re-create index.json from disk first")
+    args = parser.parse_args()
+
+    index = model_registry.rebuild_index() if args.rebuild_index else model_registry.index()
+    for key, versions in sorted(index.items()):
+        meta = versions[-1]
+        print(f"{key:<28} v{meta['version']:<3} cutoff={meta['training_cutoff']} "
+              f"watermark={meta['watermark']} metrics={meta['metrics']}")
+    print(f"{len(index)} models, {sum(len(v) for v in index.values())} versions in {os.path.normpath(model_registry.root)}")
+
+
+if __name__ == "__main__":
+    main()
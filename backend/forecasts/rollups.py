@@ -0,0 +1,40 @@
+# forecasts/rollups.py
+import asyncio
+import os
+
+from sqlalchemy import text
+
+from db.database import engine
+
+# How often the API folds queued orders into the rollup (0 = only the batch job refreshes it)
+ROLLUP_REFRESH_SECONDS = float(os.getenv("ROLLUP_REFRESH_SECONDS", "60"))
+
+
+def refresh_merchant_daily_sales() -> int:
+    """
+    Fold newly ingested orders into the merchant_daily_sales rollup.
+
+    Only the (merchant, day) pairs queued by the ingestion triggers are
+    re-aggregated, so this is a no-op when nothing new has arrived.
+
+    Returns:
+        Number of rollup rows written.
+    """
+    with engine.begin() as conn:
+        return conn.execute(text("SELECT refresh_merchant_daily_sales()")).scalar() or 0
+
+
+async def refresh_rollups_periodically(interval: float = ROLLUP_REFRESH_SECONDS):
+    """
+    Background task for the API: refresh the rollup every `interval` seconds, off the
+    event loop. Forecast requests only read merchant_daily_sales; this (and the batch
+    job) is what keeps it current.
+    """
+    while True:
+        try:
+            refreshed = await asyncio.to_thread(refresh_merchant_daily_sales)
+            if refreshed:
+                print(f"Refreshed {refreshed} merchant_daily_sales rows.")
+        except Exception as e:
+            print(f"Warning: merchant_daily_sales refresh failed: {type(e).__name__} - {e}")
+        await asyncio.sleep(interval)
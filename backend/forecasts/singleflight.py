@@ -0,0 +1,114 @@
+# forecasts/singleflight.py
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class FlightAborted(Exception):
+    """The leader was cancelled or interrupted; followers retry instead of failing with it."""
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single computation.
+
+    The first caller for a key (the leader) runs the function; everyone who asks
+    for the same key while it is running waits for that result instead of
+    recomputing it. Works for both threads (`do`) and coroutines (`do_async`),
+    and the two paths coalesce with each other.
+
+    A leader's ordinary exception is shared with its followers. If the leader itself
+    is cancelled or interrupted (CancelledError, KeyboardInterrupt, ...), that says
+    nothing about the computation, so followers run the flight again instead.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_flight: dict = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.aborted = 0
+
+    def _join(self, key) -> tuple[Future, bool]:
+        """Return (future, is_leader) for key, registering a new flight if none is running."""
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            self.executions += 1
+            return future, True
+
+    def _finish(self, key, future: Future, result=None, error: BaseException | None = None):
+        with self._lock:
+            self._in_flight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _abort(self, key, future: Future):
+        with self._lock:
+            self.aborted += 1
+        self._finish(key, future, error=FlightAborted(f"{self.name} flight for {key!r} was aborted"))
+
+    def do(self, key, fn, *args, **kwargs):
+        """Blocking variant: run fn(*args, **kwargs) once per in-flight key."""
+        while True:
+            future, is_leader = self._join(key)
+            if not is_leader:
+                try:
+                    return future.result()
+                except FlightAborted:
+                    continue
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self._finish(key, future, error=e)
+                raise
+            except BaseException:
+                self._abort(key, future)
+                raise
+            self._finish(key, future, result=result)
+            return result
+
+    async def do_async(self, key, coro_fn, *args, **kwargs):
+        """Async variant: await coro_fn(*args, **kwargs) once per in-flight key."""
+        while True:
+            future, is_leader = self._join(key)
+            if not is_leader:
+                try:
+                    # Shielded: a cancelled follower must not cancel the shared future
+                    return await asyncio.shield(asyncio.wrap_future(future))
+                except FlightAborted:
+                    continue
+            try:
+                result = await coro_fn(*args, **kwargs)
+            except Exception as e:
+                self._finish(key, future, error=e)
+                raise
+            except BaseException:
+                self._abort(key, future)
+                raise
+            self._finish(key, future, result=result)
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "aborted": self.aborted,
+                "in_flight": len(self._in_flight),
+            }
+
+
+# Shared by the sales and quantity forecasters, keyed by (merchant_id, model, horizon)
+forecast_flight = SingleFlight("forecast")
@@ -1,30 +1,69 @@
+import asyncio
+import hashlib
 import json
 import os
-from fastapi import Depends, FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
 from google.genai.types import Content, Part
 import google.generativeai as genai
-from sqlalchemy import text
-from sqlalchemy.orm import Session
-from typing import Any, Dict, List, Optional
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Callable, Dict, List, Optional
 
 from auth.auth import create_access_token
-from auth.dependencies import get_current_merchant
-from db.dependencies import get_db
+from auth.dependencies import get_admin_merchant, get_current_merchant
+from db.database import pool_stats
+from db.dependencies import get_async_db
 from models.merchant import Merchant
 from schemas.merchant import Token
 from schemas.request_bodies import InsightRequest, LoginRequest, PromptRequest, HistoryMessage
-from sql_scripts.get_customers_sql import get_customers_sql
-from ai.tools import gemini_function_declarations # Assuming gemini_function_declarations is correctly defined elsewhere
+from sql_scripts.get_customers_sql import encode_customer_cursor, get_customers_sql
+from ai.chart_summary import SUMMARY_FORMAT_VERSION, summarize_chart_data
+from ai.gemini import gemini_models
+from ai.history import history_manager
+from ai.insight_cache import insight_cache, insight_cache_key
+from ai.intents import LOCAL_INTENTS_ENABLED, intent_stats, match_intent
+from ai.prefetch import Prefetch, prefetched_or, speculative_prefetcher
+from ai.responses import CHAT_RESPONSE_MODE, render_response
 # Make sure these imports are correct for your project structure
-from forecasts.forecast_qty import router as forecast_qty_router, forecast_quantity, get_forecasted_quantities
-from forecasts.forecast_sales import router as forecast_sales_router, forecast_orders, calculate_total_sales
-from sql_scripts.sql_extraction import router as sql_extraction_router, query_item_quantities, ItemQuantity, QuantitiesResponse
+from forecasts.forecast_qty import router as forecast_qty_router, forecast_quantity_async, get_forecasted_quantities, quantity_model_cache
+from forecasts.forecast_sales import router as forecast_sales_router, forecast_orders_async, calculate_total_sales, sales_model_cache
+from forecasts.executor import executor_stats
+from forecasts.global_qty import get_global_quantity_model, load_global_quantity_model
+from forecasts.registry import model_registry, preload_most_used
+from forecasts.rollups import ROLLUP_REFRESH_SECONDS, refresh_rollups_periodically
+from forecasts.singleflight import SingleFlight, forecast_flight
+from sql_scripts.sql_extraction import router as sql_extraction_router, query_item_quantities, QuantitiesResponse, ITEM_QUANTITY_COLUMNS, ITEM_QUANTITY_CASTS
+from sql_scripts.serialization import to_records
 from sql_scripts.sql_extract_monthly_sales import router as monthly_sales_router
-
-app = FastAPI()
+from sql_scripts.streaming import FORMAT_PATTERN, streaming_response
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep the daily rollup current in the background; forecast requests only read it
+    rollup_refresh = asyncio.create_task(refresh_rollups_periodically()) if ROLLUP_REFRESH_SECONDS > 0 else None
+    # Load the pre-trained global quantity model once, off the event loop
+    await asyncio.to_thread(load_global_quantity_model)
+    # Warm the model caches with the busiest merchants' registered models
+    preloaded = await asyncio.to_thread(preload_most_used, [sales_model_cache, quantity_model_cache])
+    print(f"Preloaded {preloaded} registered forecast models.")
+    # Build the Gemini models once and open the API connection before the first chat
+    if GEMINI_API_KEY:
+        try:
+            await gemini_models.warm_up()
+        except Exception as e:
+            print(f"Warning: Gemini warm-up failed: {type(e).__name__} - {e}")
+    yield
+    if rollup_refresh is not None:
+        rollup_refresh.cancel()
+    model_registry.flush_usage()
+
+app = FastAPI(lifespan=lifespan)
 
 # mount our forecasting router here
 app.include_router(forecast_sales_router)
@@ -66,12 +105,25 @@ def format_history_for_gemini(history: Optional[List[HistoryMessage]]) -> List[D
              # gemini_history.append(message_dict)
              pass # Currently ignoring function calls in history formatting
 
+    # Enforce the token budget: older turns become a cached rolling summary, old tool echoes are trimmed
+    compacted_history, usage = history_manager.compact(gemini_history)
+    if usage["tokens_saved"]:
+        print(f"History compacted: {usage['messages']} messages, ~{usage['tokens_before']} -> ~{usage['tokens_after']} tokens "
+              f"({usage['summarized_messages']} summarized, {usage['echoes_dropped']} tool echoes trimmed)")
+    return compacted_history
 
-    return gemini_history
+# Text of a (streamed) Gemini response chunk
+def response_chunk_text(chunk) -> str:
+    if not chunk.candidates or not chunk.candidates[0].content:
+        return ""
+    return "".join(part.text for part in chunk.candidates[0].content.parts if getattr(part, 'text', None))
 
 # LLM function - for carrying through with Chatbot function calling
-async def chatFunctionHelper(prompt: str, chat_history: List[Dict[str, Any]]):
-    """Generates a conversational response based on a function call result or prompt."""
+async def chatFunctionHelper(prompt: str, chat_history: List[Dict[str, Any]], on_token: Optional[Callable[[str], None]] = None):
+    """
+    Generates a conversational response based on a function call result or prompt.
+    With on_token, the response is streamed and each text chunk is passed to it as it arrives.
+    """
     if not GEMINI_API_KEY:
         print("Error in chatFunctionHelper: Gemini API Key not configured.")
         return "Error: AI service is not configured." # Return error message
@@ -79,27 +131,31 @@ async def chatFunctionHelper(prompt: str, chat_history: List[Dict[str, Any]]):
     try:
         # Use a model suitable for generating text responses based on function outcomes
         # Consider using a slightly cheaper/faster model if appropriate
-        helperModel = genai.GenerativeModel(
-            model_name="gemini-1.5-flash-latest", # Or "gemini-pro" / "gemini-1.0-pro"
-            # Tools are usually not needed for the helper, unless it needs to call functions itself
-            # tools=gemini_function_declarations,
-            system_instruction=open("./ai/prompts/chatbot_helper.txt", "r").read() # Use a dedicated helper prompt
-        )
+        # Shared model with the dedicated helper prompt (rebuilt only if the prompt file changes)
+        helperModel = gemini_models.helper_model()
 
         # Start chat with the *original* history to maintain context
         chat_session = helperModel.start_chat(history=chat_history)
 
         print(f"Chat Helper Prompt: {prompt}")
         # Send the specific prompt about the function result
-        geminiResponse = await chat_session.send_message_async(prompt)
-        print(f"Chat Helper Response Raw: {geminiResponse}") # Log raw response
+        geminiResponse = await chat_session.send_message_async(prompt, stream=on_token is not None)
 
         response_text = ""
-        if geminiResponse.candidates:
+        if on_token is not None:
+            async for chunk in geminiResponse:
+                chunk_text = response_chunk_text(chunk)
+                if chunk_text:
+                    on_token(chunk_text)
+                    response_text += chunk_text
+            response_text = response_text.strip()
+        elif geminiResponse.candidates:
              candidate = geminiResponse.candidates[0]
              if candidate.content and candidate.content.parts:
                  response_text = candidate.content.parts[0].text.strip()
 
+        print(f"Chat Helper Response Raw: {geminiResponse}") # Log raw response
+
         if not response_text:
              # Handle blocked or empty responses from the helper
              block_reason = getattr(geminiResponse, 'prompt_feedback', {}).get('block_reason', 'None')
@@ -118,6 +174,197 @@ async def chatFunctionHelper(prompt: str, chat_history: List[Dict[str, Any]]):
         return f"Sorry, I had trouble formulating a response for that action ({prompt})."
 
 
+# Reply text for a tool result: a localized template, or a helper model call in "rich" mode
+async def phrase_function_result(helper_prompt: str, formatted_history: List[Dict[str, Any]],
+                                 response_mode: str, locale: Optional[str], template: str,
+                                 on_token: Optional[Callable[[str], None]] = None, **values) -> str:
+    if response_mode == "rich":
+        return await chatFunctionHelper(helper_prompt, formatted_history, on_token)
+    return render_response(template, locale, **values)
+
+# Run a tool call (from Gemini or the local intent fast path) and build the chat reply
+async def run_function_call(function_name: str, function_args: Dict[str, Any], merchant: Merchant,
+                            formatted_history: List[Dict[str, Any]],
+                            response_mode: str = CHAT_RESPONSE_MODE, locale: Optional[str] = None,
+                            on_token: Optional[Callable[[str], None]] = None, prefetch: Optional[Prefetch] = None):
+    # --- Match Function Name ---
+    match function_name:
+        # Specialized functions - handle custom logic & response formatting
+        case "calculate_total_sales":
+            try:
+                days_arg = int(function_args.get("days", 7)) # Default to 7 days
+                if not 1 <= days_arg <= 30: # Use validation from declaration
+                     raise ValueError("Days must be between 1 and 30.")
+                # Fitting is CPU-bound, run it on the forecast pool so the event loop stays free
+                # Already running if the speculative prefetch guessed this tool
+                forecast_data = await prefetched_or(prefetch, function_name, forecast_orders_async, merchant)
+                total_sales = calculate_total_sales(forecast_data, days=days_arg)
+                # Use helper for conversational response
+                helper_prompt = (f"The total forecasted sales for the next {days_arg} days "
+                                 f"are approximately ${total_sales['total_forecasted_sales']:.2f}. "
+                                 f"Briefly confirm this calculation.")
+                response = await phrase_function_result(
+                    helper_prompt, formatted_history, response_mode, locale,
+                    "total_sales", on_token, days=days_arg, total=total_sales['total_forecasted_sales']
+                )
+                return {
+                    "response": response,
+                    "function_call": { "name": function_name, "args": function_args },
+                    "data": total_sales
+                }
+            except (ValueError, KeyError, Exception) as e:
+                 print(f"Error during '{function_name}': {e}")
+                 return {
+                     "response": f"Sorry, I couldn't calculate total sales. Error: {e}",
+                     "function_call": { "name": function_name, "args": function_args },
+                     "data": None
+                 }
+
+        case "get_forecasted_quantities":
+            try:
+                days_arg = int(function_args.get("days", 7)) # Default to 7 days
+                if not 1 <= days_arg <= 30: # Use validation from declaration
+                     raise ValueError("Days must be between 1 and 30.")
+                forecast_data = await prefetched_or(prefetch, function_name, forecast_quantity_async, merchant)
+                quantities = get_forecasted_quantities(forecast_data, days=days_arg)
+                # Format quantities directly for the response text
+                quantities_text = f"Okay, here are the forecasted quantities for the next {days_arg} days:\n\n"
+                if quantities["total_quantities_per_item"]:
+                     quantities_text += "\n".join([
+                        f"* {item_name}: {int(round(qty))} units"
+                        for item_name, qty in quantities["total_quantities_per_item"].items()
+                     ])
+                else:
+                    quantities_text += "No specific item forecasts available for this period."
+
+                return {
+                    "response": quantities_text, # Direct text response
+                    "function_call": { "name": function_name, "args": function_args },
+                    "data": quantities
+                }
+            except (ValueError, KeyError, Exception) as e:
+                 print(f"Error during '{function_name}': {e}")
+                 return {
+                     "response": f"Sorry, I couldn't get forecasted quantities. Error: {e}",
+                     "function_call": { "name": function_name, "args": function_args },
+                     "data": None
+                 }
+
+        case "get_actual_quantities":
+            try:
+                days_arg = int(function_args.get("days", 7)) # Default to 7 days
+                # Use validation range from sql_extraction.py (e.g., 1-365)
+                if not 1 <= days_arg <= 365:
+                     raise ValueError("Days parameter must be between 1 and 365.")
+
+                print(f"Executing query_item_quantities(days={days_arg}, merchant_id={merchant.merchant_id})")
+                quantity_df, start_date, end_date = await query_item_quantities(
+                    days=days_arg, merchant_id=merchant.merchant_id
+                )
+                print(f"Received {len(quantity_df)} items for range {start_date} to {end_date}")
+
+                # Format quantities directly for the response text
+                quantities_text = (f"Alright, here are the actual quantities sold "
+                                   f"over the past {days_arg} days ({start_date} to {end_date}):\n")
+                # Convert the DataFrame once, column-wise, for both the text and the payload
+                items_list = to_records(quantity_df, ITEM_QUANTITY_COLUMNS, ITEM_QUANTITY_CASTS)
+                if items_list:
+                    quantities_text += "\n".join([
+                        f"* {item['item_name']}: {item['total_quantity']} units (Sales: ${item['total_sales']:.2f})"
+                        for item in items_list
+                    ])
+                else:
+                    quantities_text += "No sales data found for this period."
+
+                # Prepare structured data payload
+                data_payload = QuantitiesResponse(
+                     days=days_arg, start_date=start_date, end_date=end_date, items=items_list
+                 ).dict()
+
+                return {
+                    "response": quantities_text, # Direct text response
+                    "function_call": { "name": function_name, "args": function_args },
+                    "data": data_payload
+                }
+            except (ValueError, Exception) as e:
+                 print(f"Error during '{function_name}' execution: {type(e).__name__} - {e}")
+                 return {
+                     "response": f"Sorry, I couldn't get the actual quantities due to an error: {e}",
+                     "function_call": { "name": function_name, "args": function_args },
+                     "data": None
+                 }
+
+        # ============================================================
+        # ====== START: MODIFIED SECTION FOR send_emails FUNCTION ======
+        # ============================================================
+        case "send_emails":
+            # Simple acknowledgement using the helper function
+            # The helper function should contain logic to give an appropriate response
+            # based on context (e.g., previous question about sending emails)
+            # This block now just triggers the helper.
+            should_send = function_args.get("send", False) # Still useful to extract arg for logging/helper context potentially
+            if not isinstance(should_send, bool):
+                print(f"Warning: 'send' argument for send_emails was not a boolean: {should_send}. Defaulting to False.")
+                should_send = False
+
+            # Generic prompt for the helper - it needs context from history to respond well
+            helper_prompt = f"The user responded regarding the request to send emails (function '{function_name}' triggered with args {function_args}). Please formulate an appropriate acknowledgement."
+
+            response = await phrase_function_result(
+                helper_prompt, formatted_history, response_mode, locale,
+                "send_emails_confirmed" if should_send else "send_emails_declined", on_token
+            )
+            return {
+                "response": response,
+                "function_call": {
+                    "name": function_name,
+                    "args": {"send": should_send}, # Echo the arg back
+                }
+            }
+        # ============================================================
+        # ====== END: MODIFIED SECTION FOR send_emails FUNCTION ========
+        # ============================================================
+
+        case "show_customers":
+             # This function primarily triggers frontend navigation.
+             # Generate a response using the helper and add the follow-up question.
+             days_ago = function_args.get("daysAgo")
+             prompt_detail = f"with customers who ordered in the last {days_ago} days" if days_ago else "with the customer list"
+             helper_prompt = (f"Acknowledge the request to show customers has been processed ({prompt_detail}). "
+                              f"Then, ask the user if they would like to prepare emails for these customers.")
+
+             response = await phrase_function_result(
+                 helper_prompt, formatted_history, response_mode, locale,
+                 "show_customers_filtered" if days_ago else "show_customers_all", on_token, days_ago=days_ago
+             )
+             return {
+                 "response": response,
+                 "function_call": {
+                     "name": function_name,
+                     "args": function_args, # Pass args like daysAgo
+                 }
+                 # No 'data' needed if frontend handles fetching via navigation
+             }
+
+
+        # Fallback for any other function calls defined in tools but not handled above
+        case _:
+             print(f"Warning: Unhandled function call detected: {function_name}")
+             # Use helper for a generic "I did something" response
+             helper_prompt = f"Acknowledge that an action related to '{function_name}' with arguments {function_args} was triggered, but provide no specific details."
+             response = await phrase_function_result(
+                 helper_prompt, formatted_history, response_mode, locale, "unhandled", on_token
+             )
+             return {
+                 "response": response,
+                 "function_call": { # Still useful to return the call info
+                     "name": function_name,
+                     "args": function_args,
+                 }
+             }
+    # --- End Match ---
+
+
 # --- Endpoints ---
 # Chatbot API
 @app.post("/api/chat")
@@ -128,19 +375,28 @@ async def chat(reqBody: PromptRequest, merchant: Merchant = Depends(get_current_
         raise HTTPException(status_code=503, detail="AI service is not configured.")
 
     try:
-        geminiModel = genai.GenerativeModel(
-            model_name="gemini-1.5-flash-latest", # Using a potentially more capable model
-            tools=gemini_function_declarations,
-            system_instruction=open("./ai/prompts/prompt3.txt", "r").read()
-        )
+        geminiModel = gemini_models.chat_model()
     except Exception as e:
         print(f"Error initializing Gemini Model: {e}")
         raise HTTPException(status_code=500, detail="AI service initialization failed.")
 
 
     formatted_history = format_history_for_gemini(reqBody.history)
+    response_mode = reqBody.response_mode or CHAT_RESPONSE_MODE
+
+    # Unambiguous requests ("sales for the next two weeks") skip the function-calling round trip
+    if LOCAL_INTENTS_ENABLED:
+        intent = match_intent(reqBody.message)
+        intent_stats.record(intent)
+        if intent is not None:
+            print(f"Local intent matched: {intent['name']} with args: {intent['args']}")
+            return await run_function_call(
+                intent["name"], intent["args"], merchant, formatted_history, response_mode, reqBody.locale
+            )
 
     chat_session = geminiModel.start_chat(history=formatted_history)
+    # Optionally start the likely forecast while Gemini decides which tool to call
+    prefetch = speculative_prefetcher.start(reqBody.message, merchant.merchant_id)
 
     try:
         print(f"Sending to Gemini: '{reqBody.message}' with history length {len(formatted_history)}")
@@ -183,167 +439,10 @@ async def chat(reqBody: PromptRequest, merchant: Merchant = Depends(get_current_
             function_args = dict(function_call.args) if function_call.args else {}
             print(f"Function call detected: {function_name} with args: {function_args}")
 
-            # --- Match Function Name ---
-            match function_name:
-                # Specialized functions - handle custom logic & response formatting
-                case "calculate_total_sales":
-                    try:
-                        days_arg = int(function_args.get("days", 7)) # Default to 7 days
-                        if not 1 <= days_arg <= 30: # Use validation from declaration
-                             raise ValueError("Days must be between 1 and 30.")
-                        forecast_data = forecast_orders(merchant)
-                        total_sales = calculate_total_sales(forecast_data, days=days_arg)
-                        # Use helper for conversational response
-                        helper_prompt = (f"The total forecasted sales for the next {days_arg} days "
-                                         f"are approximately ${total_sales['total_forecasted_sales']:.2f}. "
-                                         f"Briefly confirm this calculation.")
-                        return {
-                            "response": await chatFunctionHelper(helper_prompt, formatted_history),
-                            "function_call": { "name": function_name, "args": function_args },
-                            "data": total_sales
-                        }
-                    except (ValueError, KeyError, Exception) as e:
-                         print(f"Error during '{function_name}': {e}")
-                         return {
-                             "response": f"Sorry, I couldn't calculate total sales. Error: {e}",
-                             "function_call": { "name": function_name, "args": function_args },
-                             "data": None
-                         }
-
-                case "get_forecasted_quantities":
-                    try:
-                        days_arg = int(function_args.get("days", 7)) # Default to 7 days
-                        if not 1 <= days_arg <= 30: # Use validation from declaration
-                             raise ValueError("Days must be between 1 and 30.")
-                        forecast_data = forecast_quantity(merchant)
-                        quantities = get_forecasted_quantities(forecast_data, days=days_arg)
-                        # Format quantities directly for the response text
-                        quantities_text = f"Okay, here are the forecasted quantities for the next {days_arg} days:\n\n"
-                        if quantities["total_quantities_per_item"]:
-                             quantities_text += "\n".join([
-                                f"* {item_name}: {int(round(qty))} units"
-                                for item_name, qty in quantities["total_quantities_per_item"].items()
-                             ])
-                        else:
-                            quantities_text += "No specific item forecasts available for this period."
-
-                        return {
-                            "response": quantities_text, # Direct text response
-                            "function_call": { "name": function_name, "args": function_args },
-                            "data": quantities
-                        }
-                    except (ValueError, KeyError, Exception) as e:
-                         print(f"Error during '{function_name}': {e}")
-                         return {
-                             "response": f"Sorry, I couldn't get forecasted quantities. Error: {e}",
-                             "function_call": { "name": function_name, "args": function_args },
-                             "data": None
-                         }
-
-                case "get_actual_quantities":
-                    try:
-                        days_arg = int(function_args.get("days", 7)) # Default to 7 days
-                        # Use validation range from sql_extraction.py (e.g., 1-365)
-                        if not 1 <= days_arg <= 365:
-                             raise ValueError("Days parameter must be between 1 and 365.")
-
-                        print(f"Executing query_item_quantities(days={days_arg}, merchant_id={merchant.merchant_id})")
-                        quantity_df, start_date, end_date = query_item_quantities(
-                            days=days_arg, merchant_id=merchant.merchant_id
-                        )
-                        print(f"Received {len(quantity_df)} items for range {start_date} to {end_date}")
-
-                        # Format quantities directly for the response text
-                        quantities_text = (f"Alright, here are the actual quantities sold "
-                                           f"over the past {days_arg} days ({start_date} to {end_date}):\n")
-                        if not quantity_df.empty:
-                            quantities_text += "\n".join([
-                                f"* {row['item_name']}: {int(row['total_quantity'])} units (Sales: ${row['total_sales']:.2f})"
-                                for _, row in quantity_df.iterrows()
-                            ])
-                        else:
-                            quantities_text += "No sales data found for this period."
-
-                        # Prepare structured data payload
-                        items_list = [
-                             ItemQuantity(item_name=row['item_name'], total_quantity=int(row['total_quantity']), total_sales=float(row['total_sales'])).dict()
-                             for _, row in quantity_df.iterrows()
-                        ]
-                        data_payload = QuantitiesResponse(
-                             days=days_arg, start_date=start_date, end_date=end_date, items=items_list
-                         ).dict()
-
-                        return {
-                            "response": quantities_text, # Direct text response
-                            "function_call": { "name": function_name, "args": function_args },
-                            "data": data_payload
-                        }
-                    except (ValueError, Exception) as e:
-                         print(f"Error during '{function_name}' execution: {type(e).__name__} - {e}")
-                         return {
-                             "response": f"Sorry, I couldn't get the actual quantities due to an error: {e}",
-                             "function_call": { "name": function_name, "args": function_args },
-                             "data": None
-                         }
-
-                # ============================================================
-                # ====== START: MODIFIED SECTION FOR send_emails FUNCTION ======
-                # ============================================================
-                case "send_emails":
-                    # Simple acknowledgement using the helper function
-                    # The helper function should contain logic to give an appropriate response
-                    # based on context (e.g., previous question about sending emails)
-                    # This block now just triggers the helper.
-                    should_send = function_args.get("send", False) # Still useful to extract arg for logging/helper context potentially
-                    if not isinstance(should_send, bool):
-                        print(f"Warning: 'send' argument for send_emails was not a boolean: {should_send}. Defaulting to False.")
-                        should_send = False
-
-                    # Generic prompt for the helper - it needs context from history to respond well
-                    helper_prompt = f"The user responded regarding the request to send emails (function '{function_name}' triggered with args {function_args}). Please formulate an appropriate acknowledgement."
-
-                    return {
-                        "response": await chatFunctionHelper(helper_prompt, formatted_history),
-                        "function_call": {
-                            "name": function_name,
-                            "args": {"send": should_send}, # Echo the arg back
-                        }
-                    }
-                # ============================================================
-                # ====== END: MODIFIED SECTION FOR send_emails FUNCTION ========
-                # ============================================================
-
-                case "show_customers":
-                     # This function primarily triggers frontend navigation.
-                     # Generate a response using the helper and add the follow-up question.
-                     days_ago = function_args.get("daysAgo")
-                     prompt_detail = f"with customers who last ordered more than {days_ago} days ago" if days_ago else "with the customer list"
-                     helper_prompt = (f"Acknowledge the request to show customers has been processed ({prompt_detail}). "
-                                      f"Then, ask the user if they would like to prepare emails for these customers.")
-
-                     return {
-                         "response": await chatFunctionHelper(helper_prompt, formatted_history),
-                         "function_call": {
-                             "name": function_name,
-                             "args": function_args, # Pass args like daysAgo
-                         }
-                         # No 'data' needed if frontend handles fetching via navigation
-                     }
-
-
-                # Fallback for any other function calls defined in tools but not handled above
-                case _:
-                     print(f"Warning: Unhandled function call detected: {function_name}")
-                     # Use helper for a generic "I did something" response
-                     helper_prompt = f"Acknowledge that an action related to '{function_name}' with arguments {function_args} was triggered, but provide no specific details."
-                     return {
-                         "response": await chatFunctionHelper(helper_prompt, formatted_history),
-                         "function_call": { # Still useful to return the call info
-                             "name": function_name,
-                             "args": function_args,
-                         }
-                     }
-            # --- End Match ---
+            return await run_function_call(
+                function_name, function_args, merchant, formatted_history, response_mode, reqBody.locale,
+                prefetch=prefetch
+            )
 
         # --- Handle cases WITHOUT function calls (Pure Text Response) ---
         else:
@@ -372,16 +471,127 @@ async def chat(reqBody: PromptRequest, merchant: Merchant = Depends(get_current_
         # print(traceback.format_exc()) # Detailed traceback for server logs
         # Return a generic error to the client
         raise HTTPException(status_code=500, detail=f"An error occurred while processing your chat request.")
+    finally:
+        if prefetch is not None:
+            prefetch.release()
+
+
+# Server-sent event frame
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data), default=str)}\n\n"
+
+# Tool call events for the stream: tool_call right away, then the reply tokens, data and done
+async def stream_function_call(function_name: str, function_args: Dict[str, Any], merchant: Merchant,
+                               formatted_history: List[Dict[str, Any]], response_mode: str, locale: Optional[str],
+                               prefetch: Optional[Prefetch] = None):
+    yield sse_event("tool_call", {"name": function_name, "args": function_args})
+
+    # The tool runs as a task; helper tokens are forwarded through the queue while it works
+    tokens: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(run_function_call(
+        function_name, function_args, merchant, formatted_history, response_mode, locale, tokens.put_nowait, prefetch
+    ))
+    task.add_done_callback(lambda _: tokens.put_nowait(None))
+    streamed = False
+    try:
+        while (token := await tokens.get()) is not None:
+            streamed = True
+            yield sse_event("token", {"text": token})
+        result = task.result()
+    finally:
+        task.cancel()  # Client went away: stop the tool / helper call
+
+    # Templates and direct tool texts arrive in one piece
+    if not streamed and result.get("response"):
+        yield sse_event("token", {"text": result["response"]})
+    if result.get("data") is not None:
+        yield sse_event("data", result["data"])
+    yield sse_event("done", result)
+
+# Chatbot API, streamed as server-sent events:
+#   tool_call {name, args}  as soon as a function call is detected
+#   token {text}            reply text, chunk by chunk
+#   data {...}              structured tool payload (same as "data" from /api/chat)
+#   error {detail}          failure after the stream started
+#   done {...}              the full /api/chat response body
+@app.post("/api/chat/stream")
+async def chat_stream(reqBody: PromptRequest, merchant: Merchant = Depends(get_current_merchant)):
+
+    if not GEMINI_API_KEY:
+        print("Error in /api/chat/stream: Gemini API Key not configured.")
+        raise HTTPException(status_code=503, detail="AI service is not configured.")
+
+    formatted_history = format_history_for_gemini(reqBody.history)
+    response_mode = reqBody.response_mode or CHAT_RESPONSE_MODE
+
+    async def events():
+        prefetch = None
+        try:
+            intent = match_intent(reqBody.message) if LOCAL_INTENTS_ENABLED else None
+            if LOCAL_INTENTS_ENABLED:
+                intent_stats.record(intent)
+            if intent is not None:
+                print(f"Local intent matched: {intent['name']} with args: {intent['args']}")
+                async for event in stream_function_call(
+                    intent["name"], intent["args"], merchant, formatted_history, response_mode, reqBody.locale
+                ):
+                    yield event
+                return
+
+            chat_session = gemini_models.chat_model().start_chat(history=formatted_history)
+            prefetch = speculative_prefetcher.start(reqBody.message, merchant.merchant_id)
+            print(f"Streaming to Gemini: '{reqBody.message}' with history length {len(formatted_history)}")
+            geminiResponse = await chat_session.send_message_async(reqBody.message, stream=True)
+
+            function_call = None
+            response_text = ""
+            async for chunk in geminiResponse:
+                if not chunk.candidates or not chunk.candidates[0].content:
+                    continue
+                for part in chunk.candidates[0].content.parts:
+                    if part.function_call:
+                        function_call = part.function_call
+                    elif getattr(part, 'text', None):
+                        response_text += part.text
+                        yield sse_event("token", {"text": part.text})
+                if function_call:
+                    break  # Function calls arrive whole; run the tool without waiting for the rest
+
+            if function_call:
+                function_args = dict(function_call.args) if function_call.args else {}
+                print(f"Function call detected: {function_call.name} with args: {function_args}")
+                async for event in stream_function_call(
+                    function_call.name, function_args, merchant, formatted_history, response_mode, reqBody.locale, prefetch
+                ):
+                    yield event
+                return
+
+            if not response_text.strip():
+                print("Warning: Gemini streamed response was empty.")
+                response_text = "I received your message, but I don't have a specific response for that right now."
+                yield sse_event("token", {"text": response_text})
+            yield sse_event("done", {"response": response_text.strip()})
+
+        except Exception as e:
+            print(f"Error during streamed chat: {type(e).__name__} - {e}")
+            yield sse_event("error", {"detail": "An error occurred while processing your chat request."})
+        finally:
+            if prefetch is not None:
+                prefetch.release()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # Login API
 @app.post("/api/login", response_model=Token)
-def login(reqBody: LoginRequest, db: Session = Depends(get_db)):
-    merchant = (
-        db.query(Merchant)
-          .filter(Merchant.merchant_id == reqBody.merchant_id)
-          .first()
-    )
+async def login(reqBody: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Merchant).where(Merchant.merchant_id == reqBody.merchant_id))
+    merchant = result.scalars().first()
     if not merchant:
         raise HTTPException(status_code=404, detail="Merchant not found")
     token = create_access_token(data={"sub": merchant.merchant_id})
@@ -390,14 +600,81 @@ def login(reqBody: LoginRequest, db: Session = Depends(get_db)):
 
 @app.get("/api/getCustomersByMerchant")
 async def get_customers(
+    days_ago: Optional[int] = Query(None, ge=1, description="Only customers who ordered within this many days"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size (omit for all customers)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    format: str = Query("json", pattern=FORMAT_PATTERN, description="json, or ndjson / csv to stream the rows"),
     merchant: Merchant = Depends(get_current_merchant),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    result = db.execute(text(get_customers_sql(merchant.merchant_id)))
+    streaming = format != "json"
+    try:
+        # Fetch one extra row to know whether there is another page
+        sql, params = get_customers_sql(
+            merchant.merchant_id, days_ago=days_ago, cursor=cursor,
+            limit=limit + 1 if limit is not None and not streaming else limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Streamed exports are written row batch by row batch, without next_cursor
+    if streaming:
+        return streaming_response(sql, params, format, filename=f"customers_{merchant.merchant_id.strip()}")
+
+    result = await db.execute(text(sql), params)
     rows = result.fetchall()
     cols = result.keys()
     data = [dict(zip(cols, row)) for row in rows]
-    return {"results": data}
+
+    next_cursor = None
+    if limit is not None and len(data) > limit:
+        data = data[:limit]
+        next_cursor = encode_customer_cursor(data[-1]["last_order_date"], data[-1]["customer_id"])
+    return {"results": data, "next_cursor": next_cursor}
+
+# Forecast pipeline metrics: model cache hits, coalesced calls, pool load
+@app.get("/api/metrics/forecasts")
+def forecast_metrics(admin: Merchant = Depends(get_admin_merchant)):
+    return {
+        "singleflight": forecast_flight.stats(),
+        "model_cache": sales_model_cache.stats(),
+        "quantity_model_cache": quantity_model_cache.stats(),
+        "registry": model_registry.stats(),
+        "executor": executor_stats(),
+        "global_quantity_model": model.info() if (model := get_global_quantity_model()) else None,
+    }
+
+# Shared database connection pool usage
+@app.get("/api/metrics/db")
+def db_metrics(admin: Merchant = Depends(get_admin_merchant)):
+    return {"pool": pool_stats()}
+
+# Gemini model reuse, insight cache, local intent fast path, speculative prefetch and history compaction
+@app.get("/api/metrics/ai")
+def ai_metrics(admin: Merchant = Depends(get_admin_merchant)):
+    return {
+        "gemini": gemini_models.stats(),
+        "insight_cache": insight_cache.stats(),
+        "insight_singleflight": insight_flight.stats(),
+        "local_intents": intent_stats.stats(),
+        "history": history_manager.stats(),
+        "speculative_prefetch": speculative_prefetcher.stats(),
+    }
+
+# Identical insight requests in flight share one Gemini call
+insight_flight = SingleFlight("insight")
+
+INSIGHT_PROMPT = """Analyze the following data for the chart titled "{chart_title}" displayed on a business dashboard for merchant ID '{merchant_id}'.
+
+Provide 2-3 concise bullet points summarizing the most important insights, trends, or anomalies found in the data. Focus on information that would be actionable or noteworthy for the business owner.
+
+Data (either the rows themselves, or for larger charts per-column statistics computed over every row: min/max, mean, sum, top/bottom values, trend slope, change points in the mean, and a downsampled "series" of [x, value] points):
+{data_string}
+
+Insights:
+"""
+# Part of the insight cache key: editing the prompt or the chart summary format invalidates cached insights
+INSIGHT_PROMPT_VERSION = hashlib.sha256(f"{INSIGHT_PROMPT}|summary-v{SUMMARY_FORMAT_VERSION}".encode("utf-8")).hexdigest()[:16]
 
 # --- NEW ENDPOINT FOR CHART INSIGHTS ---
 @app.post("/api/generate_insights")
@@ -420,36 +697,34 @@ async def generate_insights(
         return {"insight": "No data provided for analysis."}
         # Or raise HTTPException(status_code=400, detail="chart_data cannot be empty.")
 
+    # Same merchant, title and data (in any key order), model and prompt -> same insight, no LLM call
+    cache_key = insight_cache_key(
+        merchant.merchant_id, reqBody.chart_title, reqBody.chart_data, f"{gemini_models.model_name}:{INSIGHT_PROMPT_VERSION}"
+    )
+    cached_insight = insight_cache.get(cache_key)
+    if cached_insight is not None:
+        print(f"Insight cache hit for '{reqBody.chart_title}'.")
+        return {"insight": cached_insight}
+
     # 3. Initialize Gemini Model (Simpler config for direct generation)
     try:
         # Use a model suitable for text generation/analysis.
         # No tools or complex system prompt needed here usually.
-        insightModel = genai.GenerativeModel(model_name="gemini-1.5-flash-latest") # Or "gemini-pro"
+        insightModel = gemini_models.insight_model()
     except Exception as e:
         print(f"Error creating Gemini Model for insights: {e}")
         raise HTTPException(status_code=500, detail="AI service initialization failed.")
 
     # 4. Construct the Prompt
     try:
-        # Convert chart data to a pretty-printed JSON string for the prompt
-        data_string = json.dumps(reqBody.chart_data, indent=2)
-
-        # Limit data string length if necessary to avoid exceeding token limits
-        max_data_length = 4000 # Example limit, adjust as needed
-        if len(data_string) > max_data_length:
-            data_string = data_string[:max_data_length] + "\n... (data truncated)"
-            print(f"Warning: Chart data for '{reqBody.chart_title}' truncated for prompt.")
+        # Small charts go in as compact JSON; larger ones as per-column statistics over all rows
+        # plus a downsampled series, bounded in size (off the event loop: large charts take ~100ms)
+        data_string = await asyncio.to_thread(summarize_chart_data, reqBody.chart_data)
 
         # Craft the prompt
-        prompt = f"""Analyze the following data for the chart titled "{reqBody.chart_title}" displayed on a business dashboard for merchant ID '{merchant.merchant_id}'.
-
-Provide 2-3 concise bullet points summarizing the most important insights, trends, or anomalies found in the data. Focus on information that would be actionable or noteworthy for the business owner.
-
-Data:
-{data_string}
-
-Insights:
-"""
+        prompt = INSIGHT_PROMPT.format(
+            chart_title=reqBody.chart_title, merchant_id=merchant.merchant_id, data_string=data_string
+        )
         print(f"--- Generating Insight Prompt for: {reqBody.chart_title} ---")
         # print(prompt) # Uncomment to debug the exact prompt being sent
         print("--- End Prompt ---")
@@ -460,7 +735,7 @@ Insights:
 
 
     # 5. Call Gemini API
-    try:
+    async def call_gemini() -> str:
         print(f"Sending insight generation request to Gemini for '{reqBody.chart_title}'...")
         # Use generate_content_async for a single-turn request
         geminiResponse = await insightModel.generate_content_async(prompt)
@@ -494,6 +769,12 @@ Insights:
 
 
         print(f"Generated Insight:\n{generated_text}")
+        return generated_text
+
+    try:
+        generated_text = await insight_flight.do_async(cache_key, call_gemini)
+        # Only successful insights are cached; errors and blocks are retried next time
+        insight_cache.put(cache_key, generated_text)
         return {"insight": generated_text}
 
     except HTTPException as http_exc:
@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, String
 from db.database import Base
 
 class Merchant(Base):
     __tablename__ = "merchants"
 
-    merchant_id = Column(Integer, primary_key=True, index=True)
+    merchant_id = Column(String(5), primary_key=True, index=True)
     merchant_name= Column(String, unique=False, index=True)
\ No newline at end of file
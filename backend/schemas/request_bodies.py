@@ -1,5 +1,5 @@
-from typing import List, Literal, Dict, Any
-from pydantic import BaseModel
+from typing import List, Literal, Dict, Any, Optional
+from pydantic import BaseModel, Field
 
 class HistoryMessage(BaseModel):
     sender: Literal['user', 'bot'] # Use Literal for specific values
@@ -8,6 +8,8 @@ class HistoryMessage(BaseModel):
 class PromptRequest(BaseModel): 
     message: str
     history: List[HistoryMessage]
+    locale: Optional[str] = None # e.g. "en-US", language of templated replies
+    response_mode: Optional[Literal['template', 'rich']] = None # Defaults to CHAT_RESPONSE_MODE
 
 class LoginRequest(BaseModel):
     merchant_id: str
@@ -15,4 +17,8 @@ class LoginRequest(BaseModel):
 
 class InsightRequest(BaseModel):
     chart_title: str
-    chart_data: List[Dict[str, Any]]
\ No newline at end of file
+    chart_data: List[Dict[str, Any]]
+
+class BatchForecastRequest(BaseModel):
+    merchant_ids: List[str] = Field(..., min_length=1)
+    days: int = Field(30, ge=1, le=30)
@@ -1,46 +1,72 @@
-def get_customers_sql(merchant_id):
-  return f'''
-WITH customer_orders AS (
-    SELECT
-        td.eater_id,
-        td.order_time,
-        ti.item_id,
-        i.item_name,
-        td.merchant_id
-    FROM
-        transaction_data td
-    JOIN transaction_items ti ON td.order_id = ti.order_id
-    JOIN items i ON ti.item_id = i.item_id
-    WHERE
-        td.merchant_id = '{merchant_id}'
-),
-last_order AS (
-    SELECT
-        eater_id,
-        MAX(order_time) AS last_order_date
-    FROM
-        customer_orders
-    GROUP BY
-        eater_id
-),
-favorite_food AS (
-    SELECT
-        eater_id,
-        item_name,
-        COUNT(*) AS item_count,
-        ROW_NUMBER() OVER (PARTITION BY eater_id ORDER BY COUNT(*) DESC) AS rn
-    FROM
-        customer_orders
-    GROUP BY
-        eater_id, item_name
-)
+import base64
+import json
+from datetime import datetime, timedelta
+
+# "Today" for the days_ago filter - fixed for the demo dataset, same as the
+# frontend's SIMULATED_TODAY and the test-mode end date in sql_extraction.py
+CUSTOMERS_REFERENCE_DATE = datetime(2023, 12, 31)
+
+
+def encode_customer_cursor(last_order_date: datetime, customer_id: int) -> str:
+    """Opaque keyset cursor pointing just after (last_order_date, customer_id)."""
+    raw = json.dumps([last_order_date.isoformat(), int(customer_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_customer_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverse of encode_customer_cursor. Raises ValueError for malformed cursors."""
+    try:
+        last_order_date, customer_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(last_order_date), int(customer_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def get_customers_sql(merchant_id, days_ago=None, cursor=None, limit=None):
+    """
+    Build the customer list query (last order date + favorite food per customer).
+
+    Reads the customer_summary table (db/postgres/init/08_customer_summary.sql),
+    which the database keeps up to date as orders are ingested. Rows are ordered
+    by (last_order_date, customer_id) descending, so pages are fetched with a
+    keyset cursor instead of OFFSET - one range scan of customer_summary_recency_idx.
+
+    Args:
+        merchant_id: Merchant whose customers to list.
+        days_ago: Only customers whose last order is within this many days of
+                  CUSTOMERS_REFERENCE_DATE.
+        cursor: Cursor from the previous page (see encode_customer_cursor).
+        limit: Maximum number of rows to return.
+
+    Returns:
+        (sql, params) tuple for db.execute(text(sql), params).
+    """
+    params = {"merchant_id": merchant_id}
+    # Customers without any ordered items have no favorite food and are not listed
+    filters = ["cs.merchant_id = :merchant_id", "cs.favorite_item IS NOT NULL"]
+    if days_ago is not None:
+        filters.append("cs.last_order_date > :since")
+        params["since"] = CUSTOMERS_REFERENCE_DATE - timedelta(days=days_ago)
+    if cursor is not None:
+        filters.append("(cs.last_order_date, cs.eater_id) < (:cursor_date, :cursor_id)")
+        params["cursor_date"], params["cursor_id"] = decode_customer_cursor(cursor)
+    where = "\n    AND ".join(filters)
+    limit_clause = ""
+    if limit is not None:
+        limit_clause = "LIMIT :limit"
+        params["limit"] = limit
+
+    return f'''
 SELECT
-    lo.eater_id AS customer_id,
-    lo.last_order_date,
-    ff.item_name AS favorite_food
+    cs.eater_id AS customer_id,
+    cs.last_order_date,
+    cs.favorite_item AS favorite_food,
+    cs.order_count
 FROM
-    last_order lo
-JOIN favorite_food ff ON lo.eater_id = ff.eater_id AND ff.rn = 1
+    customer_summary cs
+WHERE
+    {where}
 ORDER BY
-    lo.last_order_date DESC;
-'''
\ No newline at end of file
+    cs.last_order_date DESC, cs.eater_id DESC
+{limit_clause};
+''', params
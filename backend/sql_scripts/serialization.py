@@ -0,0 +1,76 @@
+# sql_scripts/serialization.py
+"""
+Vectorized DataFrame -> response encoding shared by the data endpoints.
+
+Rows are converted column by column by pandas / pyarrow instead of building one
+dict or Pydantic object per row with iterrows(). Endpoints can offer three shapes:
+
+- json:     the usual records shape, {..., "items": [{"col": value, ...}, ...]}
+- columnar: same envelope, but {..., "items": {"col": [values, ...]}} - no repeated keys
+- arrow:    Apache Arrow IPC stream of the rows, with the envelope in the schema metadata
+"""
+from typing import Callable, Iterable
+
+import pandas as pd
+import pyarrow as pa
+from fastapi.responses import JSONResponse, Response
+
+FRAME_FORMATS = ("json", "columnar", "arrow")
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def format_pattern(formats: Iterable[str]) -> str:
+    """Query(pattern=...) accepting exactly the given format names."""
+    return f"^({'|'.join(formats)})$"
+
+
+def map_unique(series: pd.Series, fn: Callable) -> pd.Series:
+    """Apply fn once per distinct value of series (e.g. a regex over repeated item names)."""
+    lookup = {value: fn(value) for value in series.unique()}
+    return series.map(lookup)
+
+
+def select_columns(df: pd.DataFrame, columns: list[str], casts: dict | None = None) -> pd.DataFrame:
+    """The response columns of df, in order, with the given dtype casts applied column-wise."""
+    frame = df[columns]
+    return frame.astype(casts) if casts else frame
+
+
+def to_records(df: pd.DataFrame, columns: list[str], casts: dict | None = None) -> list[dict]:
+    """[{col: value}] with native Python values."""
+    return select_columns(df, columns, casts).to_dict(orient="records")
+
+
+def to_columns(df: pd.DataFrame, columns: list[str], casts: dict | None = None) -> dict[str, list]:
+    """{col: [values]} with native Python values."""
+    return {name: values.tolist() for name, values in select_columns(df, columns, casts).items()}
+
+
+def to_arrow_ipc(df: pd.DataFrame, columns: list[str], casts: dict | None = None, metadata: dict | None = None) -> bytes:
+    """Serialize the rows as an Arrow IPC stream; metadata values are stored as strings."""
+    table = pa.Table.from_pandas(select_columns(df, columns, casts), preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            **{str(key): str(value) for key, value in metadata.items()},
+        })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def frame_response(df: pd.DataFrame, columns: list[str], fmt: str, envelope: dict, rows_key: str, casts: dict | None = None):
+    """
+    Put df's rows under envelope[rows_key] in the requested format.
+
+    "json" returns a plain dict, so the endpoint's response_model still applies;
+    "columnar" and "arrow" return a ready Response.
+    """
+    if fmt == "json":
+        return {**envelope, rows_key: to_records(df, columns, casts)}
+    if fmt == "columnar":
+        return JSONResponse({**envelope, rows_key: to_columns(df, columns, casts)})
+    if fmt == "arrow":
+        return Response(to_arrow_ipc(df, columns, casts, metadata=envelope), media_type=ARROW_MEDIA_TYPE)
+    raise ValueError(f"Unsupported format: {fmt}")
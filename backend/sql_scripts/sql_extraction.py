@@ -6,23 +6,17 @@ from pydantic import BaseModel
 from typing import List 
 from datetime import datetime, timedelta
 import pandas as pd
-from sqlalchemy import create_engine, text
-import os
 
 # Added Merchant model and dependency function
 from models.merchant import Merchant
 from auth.dependencies import get_current_merchant
+from db.database import read_pandas_async
+from sql_scripts.serialization import FRAME_FORMATS, format_pattern, frame_response
+from sql_scripts.streaming import STREAM_MEDIA_TYPES, streaming_response
 
 # Define router
 router = APIRouter()
 
-# Database connection parameters - you can use environment variables in production
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME", "postgres")
-DB_USER = os.getenv("DB_USER", "postgres")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "nttc4") # Make sure this is secure in prod
-
 # Response models (Unchanged)
 class ItemQuantity(BaseModel):
     item_name: str
@@ -35,31 +29,41 @@ class QuantitiesResponse(BaseModel):
     end_date: str
     items: List[ItemQuantity]
 
-def get_db_connection():
-    """Create and return a SQLAlchemy engine"""
-    conn_string = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-    try:
-        engine = create_engine(conn_string)
-        with engine.connect() as connection:
-            pass
-        return engine
-    except Exception as e:
-        print(f"Error connecting to database: {e}")
-        raise
-
-# Modified to accept merchant_id
-def query_item_quantities(days: int, merchant_id: str):
+# --- SQL Query MODIFIED ---
+# Added WHERE clause for order_merchant_id
+# Assumes 'order_merchant_id' is the correct column in combined_order_view
+# to link sales to the merchant handling the order.
+# Response columns of ItemQuantity, with the dtypes the model expects
+ITEM_QUANTITY_COLUMNS = ["item_name", "total_quantity", "total_sales"]
+ITEM_QUANTITY_CASTS = {"total_quantity": "int64", "total_sales": "float64"}
+
+ITEM_QUANTITIES_QUERY = """
+SELECT
+    item_id,
+    item_name,
+    SUM(quantity)::INTEGER as total_quantity,
+    SUM(item_price * quantity)::FLOAT as total_sales
+FROM
+    combined_order_view
+WHERE
+    order_merchant_id = :merchant_id -- Filter by merchant ID
+    AND order_time >= :start_date
+    AND order_time <= :end_date
+GROUP BY
+    item_id, item_name
+HAVING
+    SUM(quantity) > 0
+ORDER BY
+    total_quantity DESC
+"""
+
+def item_quantities_params(days: int, merchant_id: str):
     """
-    Query item quantities for a specific merchant for the specified
-    number of past days, relative to a fixed end date (Dec 31, 2023)
-    for testing purposes.
-
-    Args:
-        days (int): Number of past days to query (relative to fixed end date)
-        merchant_id (str): The ID of the merchant to filter by.
+    Query parameters for ITEM_QUANTITIES_QUERY covering the past `days` days,
+    relative to a fixed end date (Dec 31, 2023) for testing purposes.
 
     Returns:
-        DataFrame: Item quantities and sales
+        dict: Query parameters
         str: Start date string of the query range
         str: End date string of the query range
     """
@@ -72,49 +76,36 @@ def query_item_quantities(days: int, merchant_id: str):
     end_date = datetime.strptime(fixed_end_date_str, "%Y-%m-%d").replace(hour=23, minute=59, second=59, microsecond=999999)
     start_date = end_date - timedelta(days=(days - 1))
     start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
-    start_date_param = start_date
-    end_date_param = end_date
     # --- END OF TEST MODE DATE CALCULATION ---
 
-    engine = get_db_connection()
-
-    # --- SQL Query MODIFIED ---
-    # Added WHERE clause for order_merchant_id
-    # Assumes 'order_merchant_id' is the correct column in combined_order_view
-    # to link sales to the merchant handling the order.
-    quantity_query = text("""
-    SELECT
-        item_id,
-        item_name,
-        SUM(quantity)::INTEGER as total_quantity,
-        SUM(item_price * quantity)::FLOAT as total_sales
-    FROM
-        combined_order_view
-    WHERE
-        order_merchant_id = :merchant_id -- Filter by merchant ID
-        AND order_time >= :start_date
-        AND order_time <= :end_date
-    GROUP BY
-        item_id, item_name
-    HAVING
-        SUM(quantity) > 0
-    ORDER BY
-        total_quantity DESC
-    """)
+    params = {
+        "merchant_id": merchant_id, # Pass merchant_id to query
+        "start_date": start_date,
+        "end_date": end_date
+    }
+    return params, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+
+# Modified to accept merchant_id
+async def query_item_quantities(days: int, merchant_id: str):
+    """
+    Query item quantities for a specific merchant for the specified
+    number of past days, relative to a fixed end date (Dec 31, 2023)
+    for testing purposes.
+
+    Args:
+        days (int): Number of past days to query (relative to fixed end date)
+        merchant_id (str): The ID of the merchant to filter by.
+
+    Returns:
+        DataFrame: Item quantities and sales
+        str: Start date string of the query range
+        str: End date string of the query range
+    """
+    params, start_date_str, end_date_str = item_quantities_params(days, merchant_id)
 
     try:
-        print(f"Querying quantities for merchant {merchant_id} from {start_date_param} to {end_date_param}")
-        # --- Params MODIFIED ---
-        # Added merchant_id to the parameters dictionary
-        quantity_df = pd.read_sql_query(
-            quantity_query,
-            engine,
-            params={
-                "merchant_id": merchant_id, # Pass merchant_id to query
-                "start_date": start_date_param,
-                "end_date": end_date_param
-             }
-        )
+        print(f"Querying quantities for merchant {merchant_id} from {params['start_date']} to {params['end_date']}")
+        quantity_df = await read_pandas_async(ITEM_QUANTITIES_QUERY, params)
 
         if not quantity_df.empty:
             quantity_df['total_quantity'] = quantity_df['total_quantity'].astype(int)
@@ -124,7 +115,7 @@ def query_item_quantities(days: int, merchant_id: str):
              print(f"No quantity data found for merchant {merchant_id} in the specified period.")
 
 
-        return quantity_df, start_date_param.strftime("%Y-%m-%d"), end_date_param.strftime("%Y-%m-%d")
+        return quantity_df, start_date_str, end_date_str
 
     except Exception as e:
         print(f"Error querying quantities for merchant {merchant_id}: {e}")
@@ -140,6 +131,11 @@ def query_item_quantities(days: int, merchant_id: str):
 # Added merchant dependency
 async def get_actual_quantities_endpoint(
     days: int = Query(..., ge=1, le=365, description="Number of past days (ending 2023-12-31) to retrieve data for"),
+    format: str = Query(
+        "json",
+        pattern=format_pattern(FRAME_FORMATS + tuple(STREAM_MEDIA_TYPES)),
+        description="json (records), columnar, arrow (Arrow IPC), or ndjson / csv to stream the rows"
+    ),
     merchant: Merchant = Depends(get_current_merchant) # Get current merchant
 ):
     """
@@ -149,34 +145,37 @@ async def get_actual_quantities_endpoint(
     Parameters:
     - days: Number of past days ending 2023-12-31 (must be between 1 and 365)
 
+    - format: `json` (default), `columnar` ({column: [values]}), `arrow` (Arrow IPC stream),
+      or `ndjson` / `csv` to stream one line per item
+
     Returns:
     - Dictionary with days, date range (relative to 2023-12-31), and list of items with quantities
-      filtered for the current merchant.
+      filtered for the current merchant. When streaming, the date range is sent in the
+      X-Start-Date / X-End-Date headers.
     """
     try:
+        if format in STREAM_MEDIA_TYPES:
+            params, start_date_str, end_date_str = item_quantities_params(days, merchant.merchant_id)
+            return streaming_response(
+                ITEM_QUANTITIES_QUERY, params, format,
+                filename=f"quantities_{merchant.merchant_id.strip()}_{days}d",
+                headers={"X-Start-Date": start_date_str, "X-End-Date": end_date_str},
+            )
+
         # --- Call MODIFIED ---
         # Pass merchant.merchant_id to the query function
-        quantity_df, start_date_str, end_date_str = query_item_quantities(
+        quantity_df, start_date_str, end_date_str = await query_item_quantities(
             days=days,
             merchant_id=merchant.merchant_id # Pass the authenticated merchant's ID
         )
 
-        items_list = [
-            ItemQuantity(
-                item_name=row['item_name'],
-                total_quantity=int(row['total_quantity']),
-                total_sales=float(row['total_sales'])
-            )
-            for _, row in quantity_df.iterrows()
-        ]
-
-        response = QuantitiesResponse(
-            days=days,
-            start_date=start_date_str,
-            end_date=end_date_str,
-            items=items_list
+        # Columns are converted in bulk; "json" is still validated against QuantitiesResponse
+        return frame_response(
+            quantity_df, ITEM_QUANTITY_COLUMNS, format,
+            envelope={"days": days, "start_date": start_date_str, "end_date": end_date_str},
+            rows_key="items",
+            casts=ITEM_QUANTITY_CASTS,
         )
-        return response
 
     except ValueError as e:
         # Error from query_item_quantities (e.g., invalid days)
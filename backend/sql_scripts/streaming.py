@@ -0,0 +1,84 @@
+# sql_scripts/streaming.py
+"""
+Streaming NDJSON / CSV export of query results.
+
+Rows are read through a server-side cursor on the asyncpg pool and written to the
+client batch by batch, so memory stays flat and the first bytes go out as soon as
+the first batch arrives, however many rows the query returns.
+"""
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+
+from db.database import async_engine
+
+# Rows fetched from the cursor (and written to the client) per round-trip
+STREAM_BATCH_ROWS = int(os.getenv("STREAM_BATCH_ROWS", "1000"))
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+# Query pattern for endpoints offering "json" plus the streaming formats
+FORMAT_PATTERN = f"^(json|{'|'.join(STREAM_MEDIA_TYPES)})$"
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+async def stream_query(query: str, params: dict | None, fmt: str, batch_size: int = STREAM_BATCH_ROWS) -> AsyncIterator[str]:
+    """Run a (parameterized) query with a server-side cursor and yield it encoded as NDJSON or CSV chunks."""
+    if fmt not in STREAM_MEDIA_TYPES:
+        raise ValueError(f"Unsupported stream format: {fmt}")
+
+    async with async_engine.connect() as conn:
+        result = await conn.stream(text(query), params or {})
+        columns = list(result.keys())
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+
+        async for batch in result.partitions(batch_size):
+            if fmt == "ndjson":
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=_json_default) + "\n"
+                    for row in batch
+                )
+            else:
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([_csv_value(v) for v in row] for row in batch)
+                yield buffer.getvalue()
+
+
+def streaming_response(query: str, params: dict | None, fmt: str, filename: str, headers: dict | None = None) -> StreamingResponse:
+    """StreamingResponse for stream_query; CSV is sent as a download named <filename>.csv."""
+    headers = dict(headers or {})
+    if fmt == "csv":
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return StreamingResponse(
+        stream_query(query, params, fmt),
+        media_type=STREAM_MEDIA_TYPES[fmt],
+        headers=headers,
+    )
@@ -0,0 +1,93 @@
+# tests/test_chart_summary.py
+import json
+import random
+from datetime import date, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ai.chart_summary import MAX_SUMMARY_CHARS, RAW_DATA_CHARS, change_points, compact_json, lttb, summarize_chart_data
+
+
+def daily_chart(rows: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    return [
+        {"date": str(start + timedelta(days=i)), "total_sales": round(100 + i * 0.05 + rng.gauss(0, 8), 2), "orders": rng.randint(5, 40)}
+        for i in range(rows)
+    ]
+
+
+def test_small_chart_is_sent_as_is():
+    chart = daily_chart(5)
+    summary = summarize_chart_data(chart)
+    assert len(summary) <= RAW_DATA_CHARS
+    assert json.loads(summary) == chart
+
+
+@pytest.mark.parametrize("rows", [30, 365, 5000, 50000])
+def test_summary_stays_within_bound(rows):
+    summary = summarize_chart_data(daily_chart(rows))
+    assert len(summary) <= MAX_SUMMARY_CHARS
+    parsed = json.loads(summary)
+    if len(compact_json(daily_chart(rows))) > RAW_DATA_CHARS:
+        assert parsed["rows"] == rows
+        assert parsed["x"] == "date"
+        sales = next(c for c in parsed["columns"] if c["column"] == "total_sales")
+        assert sales["count"] == rows
+        if rows >= 365:  # Enough days for the upward trend to beat the noise
+            assert sales["slope_per_day"] > 0
+
+
+def test_many_wide_columns_and_long_labels_stay_within_bound():
+    chart = [{"label": "item " + "x" * 300 + str(i), **{f"metric_{k}": i * k for k in range(20)}} for i in range(500)]
+    for max_chars in (500, 1000, MAX_SUMMARY_CHARS):
+        assert len(summarize_chart_data(chart, max_chars=max_chars)) <= max_chars
+
+
+def test_rows_are_read_in_time_order():
+    chart = daily_chart(400)
+    shuffled = chart[:]
+    random.Random(1).shuffle(shuffled)
+    assert summarize_chart_data(shuffled) == summarize_chart_data(chart)
+
+
+def test_categories_get_no_trend():
+    chart = [{"item": f"Item {i}", "quantity": i % 17} for i in range(300)]
+    column = json.loads(summarize_chart_data(chart))["columns"][0]
+    assert column["column"] == "quantity"
+    assert not any(key.startswith("slope_per_") for key in column)
+    assert column["max"][1] == 16
+
+
+def test_lttb_keeps_endpoints_and_peak():
+    xs = np.arange(1000, dtype=float)
+    ys = np.sin(xs / 50)
+    ys[437] = 10.0
+    kept = lttb(xs, ys, 40)
+    assert len(kept) == 40
+    assert kept[0] == 0 and kept[-1] == 999
+    assert kept == sorted(kept)
+    assert 437 in kept
+
+
+def test_lttb_returns_everything_below_threshold():
+    xs = np.arange(10, dtype=float)
+    assert lttb(xs, xs, 40) == list(range(10))
+    assert lttb(xs, xs, 2) == list(range(10))
+
+
+def test_change_points_finds_level_shifts():
+    rng = np.random.default_rng(0)
+    ys = np.concatenate([rng.normal(10, 1, 100), rng.normal(30, 1, 100), rng.normal(5, 1, 100)])
+    found = change_points(ys)
+    assert len(found) == 2
+    assert abs(found[0] - 100) <= 2 and abs(found[1] - 200) <= 2
+
+
+def test_change_points_ignores_noise_and_constants():
+    rng = np.random.default_rng(0)
+    assert change_points(rng.normal(10, 1, 300)) == []
+    assert change_points(np.full(50, 3.0)) == []
+    assert change_points(np.arange(4, dtype=float)) == []
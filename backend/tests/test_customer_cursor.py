@@ -0,0 +1,30 @@
+# tests/test_customer_cursor.py
+import base64
+from datetime import datetime
+
+import pytest
+
+from sql_scripts.get_customers_sql import decode_customer_cursor, encode_customer_cursor
+
+
+def test_round_trip():
+    last_order = datetime(2023, 11, 5, 14, 30)
+    cursor = encode_customer_cursor(last_order, 1234)
+    assert decode_customer_cursor(cursor) == (last_order, 1234)
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_customer_cursor(datetime(2023, 12, 31, 23, 59, 59), 2**40)
+    assert all(c.isalnum() or c in "-_=" for c in cursor)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    base64.urlsafe_b64encode(b'["2023-11-05"]').decode(),
+    base64.urlsafe_b64encode(b'["yesterday", 1]').decode(),
+    base64.urlsafe_b64encode(b'["2023-11-05", "abc"]').decode(),
+])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_customer_cursor(cursor)
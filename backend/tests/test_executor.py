@@ -0,0 +1,72 @@
+# tests/test_executor.py
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException
+
+from forecasts import executor
+from forecasts.executor import executor_stats, run_forecast
+
+
+@pytest.fixture
+def one_slot(monkeypatch):
+    """A single forecast slot and a short queue timeout, created inside the test's event loop."""
+    def install():
+        monkeypatch.setattr(executor, "_slots", asyncio.Semaphore(1))
+        monkeypatch.setattr(executor, "FORECAST_QUEUE_TIMEOUT", 0.05)
+    return install
+
+
+def test_runs_on_the_pool_and_frees_the_slot():
+    def fit(a, b=0):
+        return threading.current_thread().name, a + b
+
+    name, total = asyncio.run(run_forecast(fit, 1, b=2))
+    assert name.startswith("forecast")
+    assert total == 3
+    assert executor_stats()["running"] == 0
+
+
+def test_errors_reach_the_caller():
+    def fit():
+        raise ValueError("bad data")
+
+    with pytest.raises(ValueError):
+        asyncio.run(run_forecast(fit))
+    assert executor_stats()["running"] == 0
+
+
+def test_cancelled_caller_keeps_the_slot_until_the_fit_ends(one_slot):
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_fit():
+        started.set()
+        release.wait(2)
+        return "fitted"
+
+    async def main():
+        one_slot()
+        caller = asyncio.create_task(run_forecast(slow_fit))
+        while not started.is_set():
+            await asyncio.sleep(0.005)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+
+        # The fit is still running on the pool thread: it still counts, and still holds the slot
+        assert executor_stats()["running"] == 1
+        with pytest.raises(HTTPException) as busy:
+            await run_forecast(lambda: "queued")
+        assert busy.value.status_code == 503
+
+        release.set()
+        while executor_stats()["running"]:
+            await asyncio.sleep(0.005)
+        assert await run_forecast(lambda: "next") == "next"
+
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+# tests/test_history.py
+import pytest
+
+pytest.importorskip("cachetools")
+
+from ai.history import SUMMARY_ACK, SUMMARY_HEADER, HistoryManager, history_tokens, message_text, text_message
+
+
+def conversation(turns: int, words: int = 5) -> list:
+    """`turns` alternating messages, starting with the user."""
+    return [
+        text_message("user" if i % 2 == 0 else "model", f"Message {i}. " + "word " * words)
+        for i in range(turns)
+    ]
+
+
+def assert_alternates(history: list):
+    roles = [m["role"] for m in history]
+    assert roles[0] == "user"
+    assert all(a != b for a, b in zip(roles, roles[1:])), roles
+
+
+def test_short_history_is_unchanged():
+    history = conversation(4)
+    compacted, usage = HistoryManager(keep_turns=6).compact(history)
+    assert compacted == history
+    assert usage["tokens_saved"] == 0
+
+
+@pytest.mark.parametrize("turns", [7, 8, 9, 10, 15, 16])
+@pytest.mark.parametrize("keep_turns", [3, 4, 5, 6])
+def test_summary_keeps_roles_alternating(turns, keep_turns):
+    compacted, usage = HistoryManager(keep_turns=keep_turns, token_budget=10_000).compact(conversation(turns))
+    assert message_text(compacted[0]).startswith(SUMMARY_HEADER)
+    assert_alternates(compacted)
+    assert usage["summarized_messages"] == turns - keep_turns
+
+
+@pytest.mark.parametrize("budget", [40, 80, 120, 200, 400])
+@pytest.mark.parametrize("turns", [9, 10, 20])
+def test_budget_trimming_keeps_roles_alternating(budget, turns):
+    manager = HistoryManager(keep_turns=6, token_budget=budget, summary_tokens=100)
+    compacted, usage = manager.compact(conversation(turns, words=20))
+    assert compacted
+    assert_alternates(compacted)
+    # Within budget, or down to the latest exchange
+    assert history_tokens(compacted) <= budget or len(compacted) == 2
+    assert usage["tokens_after"] == history_tokens(compacted)
+
+
+def test_summary_ack_only_before_a_user_turn():
+    manager = HistoryManager(keep_turns=3, token_budget=10_000)
+    starts_with_model, _ = manager.compact(conversation(8))  # recent: model, user, model
+    assert [m["role"] for m in starts_with_model[:2]] == ["user", "model"]
+    assert message_text(starts_with_model[1]) != SUMMARY_ACK
+    starts_with_user, _ = manager.compact(conversation(9))  # recent: user, model, user
+    assert message_text(starts_with_user[1]) == SUMMARY_ACK
+
+
+def test_old_tool_echo_is_reduced_to_its_header():
+    echo = "Here are your forecasted quantities:\n* Nasi Lemak: 12\n* Teh Tarik: 30\n* Roti Canai: 18"
+    history = [text_message("user", "quantities next week"), text_message("model", echo),
+               text_message("user", "thanks"), text_message("model", "You're welcome.")]
+    compacted, usage = HistoryManager(keep_turns=6).compact(history)
+    assert usage["echoes_dropped"] == 1
+    assert message_text(compacted[1]) == "Here are your forecasted quantities:\n[3 listed items omitted]"
+    # The latest exchange keeps its list
+    latest = history[:2]
+    assert HistoryManager(keep_turns=6).compact(latest)[0] == latest
+
+
+def test_rolling_summary_is_reused():
+    manager = HistoryManager(keep_turns=4, token_budget=10_000)
+    manager.compact(conversation(10))
+    _, usage = manager.compact(conversation(12))
+    assert usage["summary_reused_messages"] == 6
+    assert manager.stats()["summary_cache"]["hits"] == 1
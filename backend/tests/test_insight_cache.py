@@ -0,0 +1,59 @@
+# tests/test_insight_cache.py
+import json
+import os
+import time
+
+import pytest
+
+pytest.importorskip("cachetools")
+
+from ai.insight_cache import InsightCache, chart_data_hash, insight_cache_key
+
+
+def test_hash_ignores_key_order_and_whitespace():
+    assert chart_data_hash([{"a": 1, "b": 2}]) == chart_data_hash(json.loads('[ {"b": 2,  "a": 1} ]'))
+    assert chart_data_hash([{"a": 1}]) != chart_data_hash([{"a": 2}])
+
+
+def test_key_separates_merchant_title_data_and_variant():
+    data = [{"date": "2023-12-01", "sales": 10}]
+    key = insight_cache_key("m1", "Sales", data, "model:v1")
+    assert key == insight_cache_key("m1", "Sales", [dict(reversed(list(data[0].items())))], "model:v1")
+    assert key != insight_cache_key("m2", "Sales", data, "model:v1")
+    assert key != insight_cache_key("m1", "Orders", data, "model:v1")
+    assert key != insight_cache_key("m1", "Sales", data, "model:v2")
+
+
+def test_memory_hit_and_miss():
+    cache = InsightCache(max_entries=2, ttl=60)
+    assert cache.get("k") is None
+    cache.put("k", "insight")
+    assert cache.get("k") == "insight"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    InsightCache(ttl=60, cache_dir=str(tmp_path)).put("abcdef", "persisted")
+    cache = InsightCache(ttl=60, cache_dir=str(tmp_path))
+    assert cache.get("abcdef") == "persisted"
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_expired_disk_entry_is_ignored(tmp_path):
+    cache = InsightCache(ttl=60, cache_dir=str(tmp_path))
+    cache.put("abcdef", "old")
+    path = cache._path("abcdef")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"insight": "old", "created_at": time.time() - 120}, f)
+    assert InsightCache(ttl=60, cache_dir=str(tmp_path)).get("abcdef") is None
+
+
+def test_prune_disk_keeps_newest_entries(tmp_path):
+    cache = InsightCache(ttl=3600, cache_dir=str(tmp_path), disk_max_entries=3)
+    for i in range(5):
+        key = f"{i:02d}key"
+        cache.put(key, str(i))
+        os.utime(cache._path(key), (time.time() - 100 + i, time.time() - 100 + i))
+    assert cache.prune_disk() == 2
+    remaining = sorted(name for _, _, names in os.walk(tmp_path) for name in names)
+    assert remaining == ["02key.json", "03key.json", "04key.json"]
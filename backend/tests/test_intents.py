@@ -0,0 +1,73 @@
+# tests/test_intents.py
+import pytest
+
+from ai.intents import IntentStats, match_intent, parse_periods
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("What are my sales for the next two weeks?", {"name": "calculate_total_sales", "args": {"days": 14}}),
+    ("forecast revenue for the next 30 days", {"name": "calculate_total_sales", "args": {"days": 30}}),
+    ("predicted sales tomorrow", {"name": "calculate_total_sales", "args": {"days": 1}}),
+    ("how many items will I sell next week", {"name": "get_forecasted_quantities", "args": {"days": 7}}),
+    ("quantities sold in the past 3 months", {"name": "get_actual_quantities", "args": {"days": 90}}),
+    ("show customers who ordered in the last 30 days", {"name": "show_customers", "args": {"daysAgo": 30}}),
+    ("Show customers who ordered in the past fortnight", {"name": "show_customers", "args": {"daysAgo": 14}}),
+    ("list my customers", {"name": "show_customers", "args": {}}),
+    ("forecast sales for the next twenty-one days", {"name": "calculate_total_sales", "args": {"days": 21}}),
+])
+def test_matches_unambiguous_requests(message, expected):
+    assert match_intent(message) == expected
+
+
+@pytest.mark.parametrize("message", [
+    # daysAgo keeps recent customers, the opposite of an inactivity request
+    "show customers who haven't ordered in 30 days",
+    "Show customers who haven’t ordered in a fortnight",
+    "list customers who havent bought in 2 months",
+    "show customers who did not come back in 3 weeks",
+    # Negations and conditions need the model
+    "show customers who are not from Penang",
+    "list customers who don't live nearby",
+    "show customers except the ones who ordered yesterday",
+    "show customers if they ordered in the last 30 days",
+    "show customers unless they ordered this week",
+    "show customers when they haven't ordered in 30 days",
+    "show customers who haven't ordered in 30 days but spent over $100",
+    # Several periods are a range or a comparison, not one filter
+    "show customers who haven't ordered in between 2 weeks and 3 months",
+    "forecast sales for the next 7 days and the next 30 days",
+    # Periods we can't read exactly
+    "forecast sales for the next few days",
+    "expected sales over the next 1.5 weeks",
+    # Comparisons, explanations, out of range, ambiguous tense or topic
+    "compare sales for the next 2 weeks",
+    "why will sales drop next week",
+    "forecast sales for the next 60 days",
+    "sales for 2 weeks",
+    "sales and quantities for next week",
+    "email customers who haven't ordered in 30 days",
+    "",
+])
+def test_falls_back_to_gemini(message):
+    assert match_intent(message) is None
+
+
+def test_parse_periods():
+    assert parse_periods("next 2 weeks") == [14]
+    assert parse_periods("next month") == [30]
+    assert parse_periods("twenty-one days") == [21]
+    assert parse_periods("a few days") == [None]
+    assert parse_periods("1.5 weeks") == [None]
+    assert parse_periods("two hundred days") == [None]
+    assert parse_periods("between 2 weeks and 3 months") == [14, 90]
+    assert parse_periods("tomorrow") == [1]
+    assert parse_periods("nothing here") == []
+
+
+def test_intent_stats():
+    stats = IntentStats()
+    stats.record({"name": "calculate_total_sales", "args": {"days": 7}})
+    stats.record(None)
+    assert stats.stats()["matched"] == {"calculate_total_sales": 1}
+    assert stats.stats()["fallbacks"] == 1
+    assert stats.stats()["hit_rate"] == 0.5
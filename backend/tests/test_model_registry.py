@@ -0,0 +1,120 @@
+# tests/test_model_registry.py
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+np = pytest.importorskip("numpy")
+xgboost = pytest.importorskip("xgboost")
+
+from forecasts.model_cache import ModelCache
+from forecasts.registry import ModelRegistry
+
+
+def small_booster() -> "xgboost.Booster":
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(50, 3))
+    return xgboost.train({"max_depth": 2}, xgboost.DMatrix(X, label=X[:, 0] * 2), num_boost_round=3)
+
+
+def test_save_load_round_trip(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    booster = small_booster()
+    meta = registry.save("xgb", "m1", {"model": booster, "names": ["a", "b"]}, watermark=("2023-12-01", 3), metrics={"mae": 1.5})
+    assert meta["version"] == 1
+    assert meta["watermark"] == ["2023-12-01", 3]
+
+    value, loaded_meta = registry.load("xgb", "m1")
+    assert loaded_meta == meta
+    assert value["names"] == ["a", "b"]
+    X = xgboost.DMatrix(np.ones((2, 3)))
+    assert np.allclose(value["model"].predict(X), booster.predict(X))
+
+
+def test_versions_are_pruned_and_indexed(tmp_path):
+    registry = ModelRegistry(str(tmp_path), keep_versions=2)
+    for i in range(4):
+        registry.save("sarima", "m1", {"i": i})
+    assert registry._versions("sarima", "m1") == [3, 4]
+    assert registry.latest("sarima", "m1")["version"] == 4
+    assert [meta["version"] for meta in registry.index()["sarima/m1"]] == [3, 4]
+    assert registry.load("sarima", "m1", version=3)[0] == {"i": 2}
+    assert registry.load("sarima", "m1", version=1) is None
+
+    registry.delete("sarima", "m1")
+    assert registry.latest("sarima", "m1") is None
+    assert "sarima/m1" not in registry.index()
+
+
+def _save_from_process(root: str, merchant_id: str, i: int):
+    registry = ModelRegistry(root, keep_versions=100)
+    registry.save("sarima", merchant_id, {"i": i})
+    registry.record_use("sarima", merchant_id)
+    registry.flush_usage()
+
+
+def test_concurrent_processes_claim_distinct_versions(tmp_path):
+    root = str(tmp_path)
+    jobs = [(f"m{i % 4}", i) for i in range(24)]
+    with ProcessPoolExecutor(max_workers=6, mp_context=multiprocessing.get_context("fork")) as pool:
+        list(pool.map(_save_from_process, [root] * len(jobs), *zip(*jobs)))
+
+    registry = ModelRegistry(root, keep_versions=100)
+    for m in range(4):
+        assert registry._versions("sarima", f"m{m}") == list(range(1, 7))
+    # Every process's index update and usage flush survived
+    assert registry.index() == registry.rebuild_index()
+    assert sum(len(versions) for versions in registry.index().values()) == 24
+    assert sorted(registry.most_used(10)) == [("sarima", f"m{m}") for m in range(4)]
+    assert not [name for name in os.listdir(os.path.join(root, "sarima", "m0")) if name.startswith(".tmp")]
+
+
+def test_usage_counts_are_flushed_and_ranked(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    for _ in range(3):
+        registry.record_use("xgb", "busy")
+    registry.record_use("xgb", "quiet")
+    registry.record_use("sarima", "other")
+    registry.flush_usage()
+    assert ModelRegistry(str(tmp_path)).most_used(2) == [("xgb", "busy"), ("xgb", "quiet")]
+    assert ModelRegistry(str(tmp_path)).most_used(5, model_type="sarima") == [("sarima", "other")]
+
+
+def test_model_cache_hit_stale_and_disk_reload(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    cache = ModelCache("sarima", registry=registry)
+    assert cache.get("m1", ("2023-12-01", 10)) is None
+    cache.put("m1", ("2023-12-01", 10), {"fit": 1})
+    assert cache.get("m1", ("2023-12-01", 10)) == {"fit": 1}
+    # New orders changed the watermark: refit needed
+    assert cache.get("m1", ("2023-12-02", 11)) is None
+
+    # A fresh process finds the model in the registry
+    fresh = ModelCache("sarima", registry=ModelRegistry(str(tmp_path)))
+    assert fresh.get("m1", ("2023-12-01", 10)) == {"fit": 1}
+    assert fresh.stats()["disk_hits"] == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_model_cache_evicts_least_recently_used(tmp_path):
+    cache = ModelCache("sarima", max_entries=2, registry=ModelRegistry(str(tmp_path)))
+    for m in ("a", "b", "c"):
+        cache.put(m, 1, {"m": m})
+    assert list(cache._entries) == ["b", "c"]
+    # Evicted from memory, still in the registry
+    assert cache.get("a", 1) == {"m": "a"}
+    assert cache.stats()["disk_hits"] == 1
+
+    cache.invalidate("a")
+    assert cache.get("a", 1) is None
+
+
+def test_model_cache_preload(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    ModelCache("sarima", registry=registry).put("m1", ("w", 1), {"fit": 2})
+    cache = ModelCache("sarima", registry=registry)
+    assert cache.preload("m1")
+    assert not cache.preload("missing")
+    assert cache.get("m1", ("w", 1)) == {"fit": 2}
+    assert cache.stats()["hits"] == 1
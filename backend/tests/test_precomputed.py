@@ -0,0 +1,24 @@
+# tests/test_precomputed.py
+import pytest
+
+pytest.importorskip("xgboost")
+
+from forecasts import precomputed
+from forecasts.precomputed import encode_watermark, is_current
+
+
+def test_current_only_while_the_watermark_matches():
+    stored = encode_watermark(("2023-11-30", 334, 5120, 9876))
+    assert is_current(stored, 10.0, ("2023-11-30", 334, 5120, 9876))
+    assert not is_current(stored, 10.0, ("2023-12-01", 335, 5131, 9890))
+    # Rows written before the watermark column existed are never served
+    assert not is_current(None, 10.0, ("2023-11-30", 334, 5120, 9876))
+
+
+def test_max_age(monkeypatch):
+    stored = encode_watermark(["2023-11-30", 1])
+    monkeypatch.setattr(precomputed, "PRECOMPUTED_MAX_AGE", 3600)
+    assert is_current(stored, 60.0, ["2023-11-30", 1])
+    assert not is_current(stored, 7200.0, ["2023-11-30", 1])
+    monkeypatch.setattr(precomputed, "PRECOMPUTED_MAX_AGE", 0)
+    assert is_current(stored, 10 ** 9, ["2023-11-30", 1])
@@ -0,0 +1,41 @@
+# tests/test_responses.py
+import re
+
+import pytest
+
+from ai.responses import TEMPLATES, render_response, resolve_locale
+
+
+@pytest.mark.parametrize("locale, expected", [
+    ("en", "en"), ("en-US", "en"), ("zh_CN", "zh"), ("MS-my", "ms"), ("id", "id"), ("fr-FR", "en"), (None, "en"), ("", "en"),
+])
+def test_resolve_locale(locale, expected):
+    assert resolve_locale(locale) == expected
+
+
+def test_render_total_sales():
+    assert render_response("total_sales", "en-GB", days=7, total=12345.678) == (
+        "Your total forecasted sales for the next 7 days are approximately $12,345.68."
+    )
+
+
+def test_every_locale_has_every_template_with_the_same_fields():
+    fields = {name: set(re.findall(r"{(\w+)", text)) for name, text in TEMPLATES["en"].items()}
+    for locale, templates in TEMPLATES.items():
+        assert templates.keys() == fields.keys(), locale
+        for name, text in templates.items():
+            assert set(re.findall(r"{(\w+)", text)) == fields[name], (locale, name)
+
+
+@pytest.mark.parametrize("locale", list(TEMPLATES))
+def test_every_template_renders(locale):
+    values = {"days": 30, "total": 1000.0, "days_ago": 14}
+    for name in TEMPLATES[locale]:
+        assert render_response(name, locale, **values)
+
+
+def test_filtered_customers_reply_matches_the_days_ago_filter():
+    # daysAgo keeps customers who ordered within the last N days
+    assert render_response("show_customers_filtered", "en", days_ago=30).startswith(
+        "Here are the customers who ordered in the last 30 days."
+    )
@@ -0,0 +1,140 @@
+# tests/test_singleflight.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from forecasts.singleflight import SingleFlight
+
+
+def test_concurrent_threads_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(2)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", compute))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["calls"] < 5:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"name": "test", "calls": 5, "executions": 1, "coalesced": 4, "aborted": 0, "in_flight": 0}
+
+
+def test_leader_error_is_shared_and_next_call_recomputes():
+    flight = SingleFlight("test")
+
+    async def main():
+        started = asyncio.Event()
+
+        async def failing():
+            started.set()
+            await asyncio.sleep(0.05)
+            raise ValueError("boom")
+
+        leader = asyncio.create_task(flight.do_async("key", failing))
+        await started.wait()
+        follower = asyncio.create_task(flight.do_async("key", failing))
+        results = await asyncio.gather(leader, follower, return_exceptions=True)
+        assert [type(r) for r in results] == [ValueError, ValueError]
+
+        async def ok():
+            return 42
+
+        # The failed flight is gone: the next call runs again
+        assert await flight.do_async("key", ok) == 42
+
+    asyncio.run(main())
+    assert flight.stats()["executions"] == 2
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_leader_makes_followers_recompute():
+    flight = SingleFlight("test")
+    runs = []
+
+    async def main():
+        started = asyncio.Event()
+
+        async def compute():
+            runs.append(1)
+            started.set()
+            await asyncio.sleep(0.05)
+            return len(runs)
+
+        leader = asyncio.create_task(flight.do_async("key", compute))
+        await started.wait()
+        follower = asyncio.create_task(flight.do_async("key", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        # The follower is not failed with the leader's cancellation; it runs the flight itself
+        assert await follower == 2
+
+    asyncio.run(main())
+    assert flight.stats()["aborted"] == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_follower_does_not_cancel_leader():
+    flight = SingleFlight("test")
+
+    async def main():
+        started = asyncio.Event()
+
+        async def compute():
+            started.set()
+            await asyncio.sleep(0.05)
+            return "done"
+
+        leader = asyncio.create_task(flight.do_async("key", compute))
+        await started.wait()
+        follower = asyncio.create_task(flight.do_async("key", compute))
+        await asyncio.sleep(0)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        assert await leader == "done"
+
+    asyncio.run(main())
+    assert flight.stats()["executions"] == 1
+    assert flight.stats()["aborted"] == 0
+
+
+def test_thread_and_async_callers_coalesce():
+    flight = SingleFlight("test")
+    release = threading.Event()
+
+    def blocking():
+        release.wait(2)
+        return "shared"
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        leader = loop.run_in_executor(None, flight.do, "key", blocking)
+        while flight.stats()["in_flight"] == 0:
+            await asyncio.sleep(0.01)
+
+        async def never_called():
+            raise AssertionError("follower must not execute")
+
+        follower = asyncio.create_task(flight.do_async("key", never_called))
+        await asyncio.sleep(0.01)
+        release.set()
+        assert await asyncio.gather(leader, follower) == ["shared", "shared"]
+
+    asyncio.run(main())
+    assert flight.stats()["executions"] == 1
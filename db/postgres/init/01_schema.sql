@@ -35,10 +35,11 @@ CREATE TABLE keywords (
     order_count INT DEFAULT 0
 );
 
--- Create 'transaction_data' table
+-- Create 'transaction_data' table, range-partitioned by month on order_time.
+-- Unique keys on a partitioned table must contain the partition key, hence (…, order_time).
 CREATE TABLE transaction_data (
-    id INT PRIMARY KEY,
-    order_id VARCHAR(100) UNIQUE NOT NULL,
+    id INT NOT NULL,
+    order_id VARCHAR(100) NOT NULL,
     order_time TIMESTAMP NOT NULL,
     driver_arrival_time TIMESTAMP,
     driver_pickup_time TIMESTAMP,
@@ -46,8 +47,10 @@ CREATE TABLE transaction_data (
     order_value DECIMAL(10, 2) NOT NULL,
     eater_id BIGINT,
     merchant_id CHAR(5) NOT NULL,
+    PRIMARY KEY (id, order_time),
+    UNIQUE (order_id, order_time),
     FOREIGN KEY (merchant_id) REFERENCES merchants(merchant_id) ON DELETE CASCADE
-);
+) PARTITION BY RANGE (order_time);
 
 -- Create 'transaction_data_staging' table
 CREATE TABLE transaction_data_staging(
@@ -63,11 +66,11 @@ CREATE TABLE transaction_data_staging(
 );
 
 -- Create 'transaction_items' table
+-- (no FK to transaction_data: order_id alone is not unique across its partitions)
 CREATE TABLE transaction_items (
     id INT PRIMARY KEY,
     order_id VARCHAR(100) NOT NULL,
     item_id INT NOT NULL,
-    FOREIGN KEY (order_id) REFERENCES transaction_data(order_id) ON DELETE CASCADE,
     FOREIGN KEY (item_id) REFERENCES items(item_id) ON DELETE CASCADE
 );
 
@@ -79,13 +82,77 @@ CREATE TABLE transaction_items_staging (
     merchant_id CHAR(5) NOT NULL
 );
 
--- Create 'new_transaction_items' table
+-- Create 'new_transaction_items' table, partitioned like transaction_data.
+-- order_time is copied from the parent order so item rows can be pruned by date too.
 CREATE TABLE new_transaction_items (
+    id BIGSERIAL,
     order_id VARCHAR(100),
     merchant_id CHAR(5),
     item_id INT,
-    quantity INT
-);
+    quantity INT,
+    order_time TIMESTAMP NOT NULL,
+    PRIMARY KEY (id, order_time)
+) PARTITION BY RANGE (order_time);
+
+-- Rows outside every monthly partition land here instead of failing the insert
+CREATE TABLE transaction_data_default PARTITION OF transaction_data DEFAULT;
+CREATE TABLE new_transaction_items_default PARTITION OF new_transaction_items DEFAULT;
+
+-- Both tables share the same monthly bounds, so joins on (order_id, order_time) can be done
+-- partition-by-partition and a date filter on one side prunes the other side as well
+DO $$
+BEGIN
+    EXECUTE format('ALTER DATABASE %I SET enable_partitionwise_join = on', current_database());
+    EXECUTE format('ALTER DATABASE %I SET enable_partitionwise_aggregate = on', current_database());
+END;
+$$;
+
+-- Create one partition per month covering [from_time, to_time] (no-op for existing months).
+-- Call it before ingesting a new month, e.g. from the load scripts.
+CREATE OR REPLACE FUNCTION create_monthly_partitions(parent TEXT, from_time TIMESTAMP, to_time TIMESTAMP)
+RETURNS INT AS $$
+DECLARE
+    month_start DATE := date_trunc('month', from_time)::DATE;
+    created INT := 0;
+    partition_name TEXT;
+BEGIN
+    WHILE month_start <= to_time LOOP
+        partition_name := format('%s_%s', parent, to_char(month_start, 'YYYY_MM'));
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, parent, month_start, (month_start + INTERVAL '1 month')::DATE
+            );
+            created := created + 1;
+        END IF;
+        month_start := (month_start + INTERVAL '1 month')::DATE;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Detach (but keep) every monthly partition that ends on or before cutoff.
+-- Detaching is a metadata-only operation; archive or DROP the detached tables afterwards.
+CREATE OR REPLACE FUNCTION detach_monthly_partitions_before(parent TEXT, cutoff DATE)
+RETURNS INT AS $$
+DECLARE
+    part RECORD;
+    detached INT := 0;
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = parent::regclass
+          AND c.relname ~ ('^' || parent || '_\d{4}_\d{2}$')
+          AND (to_date(right(c.relname, 7), 'YYYY_MM') + INTERVAL '1 month')::DATE <= cutoff
+    LOOP
+        EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', parent, part.relname);
+        detached := detached + 1;
+    END LOOP;
+    RETURN detached;
+END;
+$$ LANGUAGE plpgsql;
 
 -- Create staging for new_transaction_items
 CREATE TABLE new_transaction_items_staging (
@@ -1,4 +1,11 @@
+-- Create the monthly partitions covering the staged orders
+SELECT create_monthly_partitions('transaction_data', MIN(order_time), MAX(order_time))
+FROM transaction_data_staging;
+SELECT create_monthly_partitions('new_transaction_items', MIN(order_time), MAX(order_time))
+FROM transaction_data_staging;
+
 -- Insert into transaction_data, ignore if order_id already exists
+-- (the partitioned table can only enforce (order_id, order_time), so dedupe on order_id here)
 INSERT INTO transaction_data (
     id,
     order_id,
@@ -10,7 +17,7 @@ INSERT INTO transaction_data (
     eater_id,
     merchant_id
 )
-SELECT
+SELECT DISTINCT ON (order_id)
     id,
     order_id,
     order_time,
@@ -21,7 +28,8 @@ SELECT
     eater_id,
     merchant_id
 FROM transaction_data_staging
-ON CONFLICT (order_id) DO NOTHING;
+ORDER BY order_id, id
+ON CONFLICT (order_id, order_time) DO NOTHING;
 
 -- Insert into transaction_items (skip merchant_id)
 INSERT INTO transaction_items (
@@ -35,19 +43,23 @@ SELECT
     item_id
 FROM transaction_items_staging;
 
--- Deduplicate and insert new_transaction_items
+-- Deduplicate and insert new_transaction_items, copying order_time from the order
+-- so each item row lands in the same monthly partition as its order
 INSERT INTO new_transaction_items (
     order_id,
     merchant_id,
     item_id,
-    quantity
+    quantity,
+    order_time
 )
 SELECT DISTINCT
-    order_id,
-    merchant_id,
-    item_id,
-    quantity
-FROM new_transaction_items_staging;
+    s.order_id,
+    s.merchant_id,
+    s.item_id,
+    s.quantity,
+    td.order_time
+FROM new_transaction_items_staging s
+JOIN transaction_data td ON td.order_id = s.order_id;
 
 -- Drop the staging tables
 DROP TABLE transaction_data_staging;
@@ -15,6 +15,8 @@ SELECT
   td.driver_pickup_time,
   td.delivery_time
 FROM new_transaction_items ti
-JOIN transaction_data td ON ti.order_id = td.order_id
+-- Joining on order_time as well (the partition key) enables partition-wise joins,
+-- so date filters on order_time prune both tables' monthly partitions
+JOIN transaction_data td ON ti.order_id = td.order_id AND ti.order_time = td.order_time
 JOIN items i             ON ti.item_id = i.item_id
 JOIN merchants m         ON i.merchant_id = m.merchant_id;
@@ -0,0 +1,32 @@
+-- Forecasts precomputed offline by the backend batch job (python -m forecasts.batch).
+-- The API reads these rows instead of fitting models inside the request, as long as
+-- `watermark` (the merchant's data fingerprint when the forecast was computed, JSON)
+-- still matches the current one.
+
+-- One row per merchant per forecasted day
+CREATE TABLE IF NOT EXISTS sales_forecasts (
+    merchant_id CHAR(5) NOT NULL,
+    forecast_date DATE NOT NULL,
+    forecasted_revenue DECIMAL(12, 2) NOT NULL,
+    watermark TEXT,
+    generated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (merchant_id, forecast_date),
+    FOREIGN KEY (merchant_id) REFERENCES merchants(merchant_id) ON DELETE CASCADE
+);
+
+-- One row per merchant per item per forecasted day
+CREATE TABLE IF NOT EXISTS item_forecasts (
+    merchant_id CHAR(5) NOT NULL,
+    forecast_date DATE NOT NULL,
+    item_id INT NOT NULL,
+    item_name VARCHAR(255) NOT NULL,
+    predicted_quantity INT NOT NULL,
+    watermark TEXT,
+    generated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (merchant_id, forecast_date, item_id),
+    FOREIGN KEY (merchant_id) REFERENCES merchants(merchant_id) ON DELETE CASCADE
+);
+
+-- Databases created before the watermark column; their rows count as stale until the next batch run
+ALTER TABLE sales_forecasts ADD COLUMN IF NOT EXISTS watermark TEXT;
+ALTER TABLE item_forecasts ADD COLUMN IF NOT EXISTS watermark TEXT;
@@ -0,0 +1,31 @@
+-- Secondary indexes and keys for the order schema.
+-- Every backend query filters transaction_data by merchant (and usually a time
+-- window) and joins the item tables on order_id; without these each of them is
+-- a sequential scan over the full tables.
+-- Idempotent: safe to re-run against an existing database.
+
+-- Merchant + time window lookups (combined_order_view, customer list, rollups).
+-- INCLUDE makes it covering for the columns those queries read.
+CREATE INDEX IF NOT EXISTS transaction_data_merchant_time_idx
+    ON transaction_data (merchant_id, order_time)
+    INCLUDE (order_id, order_value, eater_id);
+
+-- Order items: index the join column (the table's key, (id, order_time), is defined in 01_schema.sql)
+CREATE INDEX IF NOT EXISTS new_transaction_items_order_idx
+    ON new_transaction_items (order_id)
+    INCLUDE (item_id, quantity);
+
+CREATE INDEX IF NOT EXISTS transaction_items_order_idx
+    ON transaction_items (order_id)
+    INCLUDE (item_id);
+
+-- Menu lookups per merchant
+CREATE INDEX IF NOT EXISTS items_merchant_idx
+    ON items (merchant_id)
+    INCLUDE (item_name, item_price);
+
+-- Refresh planner statistics for the new indexes
+ANALYZE transaction_data;
+ANALYZE new_transaction_items;
+ANALYZE transaction_items;
+ANALYZE items;
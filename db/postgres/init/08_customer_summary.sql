@@ -0,0 +1,174 @@
+-- Per-merchant customer summary backing the GrabBack customer list.
+-- Maintained incrementally by statement triggers on transaction_data and
+-- transaction_items, so the list is a single index range scan instead of a
+-- join + ranking over every order of the merchant.
+CREATE TABLE IF NOT EXISTS customer_summary (
+    merchant_id CHAR(5) NOT NULL,
+    eater_id BIGINT NOT NULL,
+    last_order_date TIMESTAMP NOT NULL,
+    -- Most ordered item_name (ties broken alphabetically); NULL until the customer has items
+    favorite_item VARCHAR(255),
+    order_count INT NOT NULL DEFAULT 0,
+    -- item_name -> number of order item rows, the input to favorite_item
+    item_counts JSONB NOT NULL DEFAULT '{}'::jsonb,
+    PRIMARY KEY (merchant_id, eater_id)
+);
+
+-- transaction_items has no order_time, and order_id is unique in transaction_data only
+-- together with order_time (01_schema.sql), so the same order_id can name orders in
+-- different months. Each item row is counted once, for the earliest order with its
+-- order_id - never once per matching order.
+
+-- Newest customers first, paged by (last_order_date, eater_id) - scanned backwards
+CREATE INDEX IF NOT EXISTS customer_summary_recency_idx
+    ON customer_summary (merchant_id, last_order_date, eater_id)
+    INCLUDE (favorite_item, order_count);
+
+-- Add two item_name -> count objects key by key
+CREATE OR REPLACE FUNCTION jsonb_add_counts(a JSONB, b JSONB) RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_object_agg(key, total), '{}'::jsonb)
+    FROM (
+        SELECT key, SUM(value::INT) AS total
+        FROM (
+            SELECT * FROM jsonb_each_text(a)
+            UNION ALL
+            SELECT * FROM jsonb_each_text(b)
+        ) kv
+        GROUP BY key
+    ) s;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION favorite_item_of(counts JSONB) RETURNS VARCHAR AS $$
+    SELECT key FROM jsonb_each_text(counts) ORDER BY value::INT DESC, key LIMIT 1;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Initial population from the data loaded by the previous scripts
+WITH orders AS (
+    SELECT merchant_id, eater_id, MAX(order_time) AS last_order_date, COUNT(*) AS order_count
+    FROM transaction_data
+    WHERE eater_id IS NOT NULL
+    GROUP BY merchant_id, eater_id
+),
+item_totals AS (
+    SELECT merchant_id, eater_id, jsonb_object_agg(item_name, item_count) AS item_counts
+    FROM (
+        SELECT td.merchant_id, td.eater_id, i.item_name, COUNT(*) AS item_count
+        FROM transaction_data td
+        JOIN transaction_items ti ON ti.order_id = td.order_id
+        JOIN items i ON i.item_id = ti.item_id
+        WHERE td.eater_id IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM transaction_data earlier
+              WHERE earlier.order_id = td.order_id AND earlier.order_time < td.order_time
+          )
+        GROUP BY td.merchant_id, td.eater_id, i.item_name
+    ) per_item
+    GROUP BY merchant_id, eater_id
+)
+INSERT INTO customer_summary (merchant_id, eater_id, last_order_date, favorite_item, order_count, item_counts)
+SELECT
+    o.merchant_id,
+    o.eater_id,
+    o.last_order_date,
+    favorite_item_of(it.item_counts),
+    o.order_count,
+    COALESCE(it.item_counts, '{}'::jsonb)
+FROM orders o
+LEFT JOIN item_totals it ON it.merchant_id = o.merchant_id AND it.eater_id = o.eater_id
+ON CONFLICT (merchant_id, eater_id) DO NOTHING;
+
+-- New orders: bump order_count / last_order_date, and count any of their items
+-- that were inserted before the order itself
+CREATE OR REPLACE FUNCTION customer_summary_add_orders() RETURNS TRIGGER AS $$
+BEGIN
+    WITH orders AS (
+        SELECT merchant_id, eater_id, MAX(order_time) AS last_order_date, COUNT(*) AS order_count
+        FROM new_rows
+        WHERE eater_id IS NOT NULL
+        GROUP BY merchant_id, eater_id
+    ),
+    item_totals AS (
+        SELECT merchant_id, eater_id, jsonb_object_agg(item_name, item_count) AS item_counts
+        FROM (
+            SELECT n.merchant_id, n.eater_id, i.item_name, COUNT(*) AS item_count
+            FROM new_rows n
+            JOIN transaction_items ti ON ti.order_id = n.order_id
+            JOIN items i ON i.item_id = ti.item_id
+            WHERE n.eater_id IS NOT NULL
+              -- Items of a reused order_id already belong to its earlier order
+              AND NOT EXISTS (
+                  SELECT 1 FROM transaction_data earlier
+                  WHERE earlier.order_id = n.order_id AND earlier.order_time < n.order_time
+              )
+            GROUP BY n.merchant_id, n.eater_id, i.item_name
+        ) per_item
+        GROUP BY merchant_id, eater_id
+    )
+    INSERT INTO customer_summary AS cs (merchant_id, eater_id, last_order_date, favorite_item, order_count, item_counts)
+    SELECT
+        o.merchant_id,
+        o.eater_id,
+        o.last_order_date,
+        favorite_item_of(it.item_counts),
+        o.order_count,
+        COALESCE(it.item_counts, '{}'::jsonb)
+    FROM orders o
+    LEFT JOIN item_totals it ON it.merchant_id = o.merchant_id AND it.eater_id = o.eater_id
+    ON CONFLICT (merchant_id, eater_id) DO UPDATE SET
+        last_order_date = GREATEST(cs.last_order_date, EXCLUDED.last_order_date),
+        order_count = cs.order_count + EXCLUDED.order_count,
+        item_counts = jsonb_add_counts(cs.item_counts, EXCLUDED.item_counts),
+        favorite_item = favorite_item_of(jsonb_add_counts(cs.item_counts, EXCLUDED.item_counts));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- New order items: add them to the counts of orders that already exist
+-- (items of orders not inserted yet are picked up by customer_summary_add_orders)
+CREATE OR REPLACE FUNCTION customer_summary_add_items() RETURNS TRIGGER AS $$
+BEGIN
+    WITH item_totals AS (
+        SELECT merchant_id, eater_id, MAX(last_order_date) AS last_order_date,
+               jsonb_object_agg(item_name, item_count) AS item_counts
+        FROM (
+            SELECT td.merchant_id, td.eater_id, i.item_name,
+                   MAX(td.order_time) AS last_order_date, COUNT(*) AS item_count
+            FROM new_rows n
+            -- One order per item row, however many orders share its order_id
+            JOIN LATERAL (
+                SELECT merchant_id, eater_id, order_time
+                FROM transaction_data
+                WHERE order_id = n.order_id
+                ORDER BY order_time
+                LIMIT 1
+            ) td ON TRUE
+            JOIN items i ON i.item_id = n.item_id
+            WHERE td.eater_id IS NOT NULL
+            GROUP BY td.merchant_id, td.eater_id, i.item_name
+        ) per_item
+        GROUP BY merchant_id, eater_id
+    )
+    INSERT INTO customer_summary AS cs (merchant_id, eater_id, last_order_date, favorite_item, order_count, item_counts)
+    SELECT merchant_id, eater_id, last_order_date, favorite_item_of(item_counts), 0, item_counts
+    FROM item_totals
+    ON CONFLICT (merchant_id, eater_id) DO UPDATE SET
+        last_order_date = GREATEST(cs.last_order_date, EXCLUDED.last_order_date),
+        item_counts = jsonb_add_counts(cs.item_counts, EXCLUDED.item_counts),
+        favorite_item = favorite_item_of(jsonb_add_counts(cs.item_counts, EXCLUDED.item_counts));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS transaction_data_customer_summary ON transaction_data;
+CREATE TRIGGER transaction_data_customer_summary
+    AFTER INSERT ON transaction_data
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION customer_summary_add_orders();
+
+DROP TRIGGER IF EXISTS transaction_items_customer_summary ON transaction_items;
+CREATE TRIGGER transaction_items_customer_summary
+    AFTER INSERT ON transaction_items
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION customer_summary_add_items();
+
+ANALYZE customer_summary;